@@ -0,0 +1 @@
+python3 src/batch.py "$@"
\ No newline at end of file
@@ -0,0 +1,68 @@
+import math
+import time
+
+class Animation:
+    """
+    Decides when an animated maze redraws its window and how long it waits.
+
+    fps:             target frames per second
+    steps_per_frame: how many drawing steps are batched into one frame
+    max_duration:    if set, the most seconds one phase (generating or solving)
+                     may take; steps per frame are raised to fit it
+    instant:         never wait, only redraw once at the end of each phase
+
+    The defaults (20 fps, one step per frame) match the original fixed
+    50 ms pause after every step.
+    """
+    def __init__(self, fps=20, steps_per_frame=1, max_duration=None, instant=False):
+        if fps <= 0:
+            raise ValueError("fps must be positive")
+        if steps_per_frame < 1:
+            raise ValueError("steps_per_frame must be at least 1")
+        self.fps = fps
+        self.steps_per_frame = steps_per_frame
+        self.max_duration = max_duration
+        self.instant = instant
+
+        self._batch = steps_per_frame
+        self._pending = 0
+        self._next_frame = None
+
+    def begin(self, total_steps):
+        """Start a phase of about `total_steps` steps."""
+        self._batch = self.steps_per_frame
+        if self.max_duration is not None:
+            frames = max(1, int(self.fps * self.max_duration))
+            self._batch = max(self._batch, math.ceil(total_steps / frames))
+        self._pending = 0
+        self._next_frame = None
+
+    def step(self, win):
+        """Count one drawing step, redrawing and waiting when a frame is due."""
+        if win is None or self.instant:
+            return
+
+        self._pending += 1
+        if self._pending < self._batch:
+            return
+        self._pending = 0
+
+        win.redraw()
+
+        # Wait until the next frame is due; if drawing is running behind,
+        # carry on from now rather than trying to catch up
+        now = time.perf_counter()
+        if self._next_frame is None:
+            self._next_frame = now
+        self._next_frame += 1 / self.fps
+        delay = self._next_frame - now
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            self._next_frame = now
+
+    def finish(self, win):
+        """End a phase, showing any steps not yet drawn."""
+        if win is not None and (self.instant or self._pending):
+            win.redraw()
+        self._pending = 0
@@ -0,0 +1,140 @@
+"""
+Reproducible benchmarks for maze generation, solving and rendering.
+
+For every size it times Maze construction, solve() and rendering onto an
+off-screen window, and records cells per second and peak memory, then prints
+everything as JSON so releases can be compared against each other:
+
+    python3 src/bench.py --sizes 10,100,1000 --output bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from maze import Maze
+from generators import GENERATORS
+from solvers import SOLVERS
+
+DEFAULT_SIZES = [10, 50, 100, 200, 500, 1000, 2000]
+
+
+class OffscreenWindow:
+    """Stands in for graphics.Window, counting drawing calls instead of drawing."""
+    def __init__(self):
+        self.lines = 0
+        self.redraws = 0
+
+    def redraw(self):
+        self.redraws += 1
+
+    def draw_line(self, line, fill_color="black", key=None):
+        self.lines += 1
+
+    def draw_segments(self, segments, fill_color="black"):
+        self.lines += len(segments)
+        self.redraw()
+
+
+def _timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def _peak_memory(function):
+    # Peak bytes allocated by Python while running function
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_size(size, generator="backtracker", algorithm="dfs", seed=0, memory=True):
+    """Benchmark one size x size maze and return its measurements."""
+    cells = size * size
+
+    def build():
+        return Maze(0, 0, size, size, 1, 1, seed=seed, generator=generator)
+
+    maze, construct_seconds = _timed(build)
+    result, solve_seconds = _timed(lambda: maze.solve(algorithm))
+
+    win = OffscreenWindow()
+    _, render_seconds = _timed(lambda: maze.render(win))
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "maze.png")
+        _, export_seconds = _timed(lambda: maze.export_image(path, cell_px=2))
+
+    measurements = {
+        "rows": size,
+        "cols": size,
+        "cells": cells,
+        "generator": generator,
+        "algorithm": algorithm,
+        "seed": seed,
+        "path_length": len(result.path),
+        "cells_expanded": result.expanded,
+        "construct_seconds": construct_seconds,
+        "construct_cells_per_second": cells / construct_seconds,
+        "solve_seconds": solve_seconds,
+        "solve_cells_per_second": result.expanded / solve_seconds,
+        "render_seconds": render_seconds,
+        "render_lines": win.lines,
+        "export_png_seconds": export_seconds,
+    }
+
+    if memory:
+        # Measured in separate runs, since tracing slows everything down;
+        # the timed maze is dropped first so it doesn't count
+        maze = None
+        measurements["construct_peak_bytes"] = _peak_memory(build)
+        maze = build()
+        measurements["solve_peak_bytes"] = _peak_memory(lambda: maze.solve(algorithm))
+
+    return measurements
+
+
+def run(sizes, generator="backtracker", algorithm="dfs", seed=0, memory=True):
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "results": [bench_size(size, generator, algorithm, seed, memory) for size in sizes],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark maze generation, solving and rendering.")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated maze side lengths")
+    parser.add_argument("--generator", default="backtracker", choices=["backtracker", *GENERATORS])
+    parser.add_argument("--algorithm", default="dfs", choices=["dfs", *SOLVERS])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="skip the peak memory runs")
+    parser.add_argument("--output", default="-", help="file for the JSON report (default: stdout)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    report = run(sizes, args.generator, args.algorithm, args.seed, not args.no_memory)
+
+    text = json.dumps(report, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,48 +1,92 @@
 from graphics import Line, Point
+from grid import TOP, RIGHT, BOTTOM, LEFT, ALL_WALLS
+
+def _wall_property(wall):
+  def getter(self):
+    return bool(self._grid.walls[self._index] & wall)
+
+  def setter(self, present):
+    if present:
+      self._grid.walls[self._index] |= wall
+    else:
+      self._grid.walls[self._index] &= ~wall & ALL_WALLS
+    self._grid.mark_changed()
+
+  return property(getter, setter)
+
 
 class Cell:
-  def __init__(self, win=None):
-    self.has_left_wall = True
-    self.has_right_wall = True
-    self.has_top_wall = True
-    self.has_bottom_wall = True
+  """
+  A view of one cell of a Grid.
+  Wall and visited flags read and write straight through to the grid,
+  so a Cell holds no maze state of its own besides its drawn position.
+  """
+  has_top_wall = _wall_property(TOP)
+  has_right_wall = _wall_property(RIGHT)
+  has_bottom_wall = _wall_property(BOTTOM)
+  has_left_wall = _wall_property(LEFT)
+
+  def __init__(self, grid, i, j, win=None):
+    self._grid = grid
+    self._i = i
+    self._j = j
+    self._index = grid.index(i, j)
     self._x1 = None
     self._x2 = None
     self._y1 = None
     self._y2 = None
     self._win = win
-    self.visited = False
 
-  def draw(self, x1, y1, x2, y2):
-    if self._win is None:
-      return
+  @property
+  def visited(self):
+    return bool(self._grid.visited[self._index])
+
+  @visited.setter
+  def visited(self, value):
+    self._grid.visited[self._index] = 1 if value else 0
 
+  def place(self, x1, y1, x2, y2):
+    # Remember where the cell is on screen without drawing it
     self._x1 = x1
     self._x2 = x2
     self._y1 = y1
     self._y2 = y2
 
+  def draw(self, x1, y1, x2, y2):
+    if self._win is None:
+      return
+
+    self.place(x1, y1, x2, y2)
+
+    # Walls are keyed by the grid line they sit on, so the wall shared by
+    # two neighbouring cells is a single canvas item
+    i = self._i
+    j = self._j
+
     # Left wall
     line = Line(Point(x1, y1), Point(x1, y2))
     color = "black" if self.has_left_wall else "white"
-    self._win.draw_line(line, color)
-    
+    self._win.draw_line(line, color, ("v", i, j))
+
     # Top wall
     line = Line(Point(x1, y1), Point(x2, y1))
     color = "black" if self.has_top_wall else "white"
-    self._win.draw_line(line, color)
-    
+    self._win.draw_line(line, color, ("h", i, j))
+
     # Right wall
     line = Line(Point(x2, y1), Point(x2, y2))
     color = "black" if self.has_right_wall else "white"
-    self._win.draw_line(line, color)
-    
+    self._win.draw_line(line, color, ("v", i, j + 1))
+
     # Bottom wall
     line = Line(Point(x1, y2), Point(x2, y2))
     color = "black" if self.has_bottom_wall else "white"
-    self._win.draw_line(line, color)
+    self._win.draw_line(line, color, ("h", i + 1, j))
 
   def draw_move(self, to_cell, undo=False):
+    if self._win is None:
+      return
+
     half_length = abs(self._x2 - self._x1) // 2
     x_center = half_length + self._x1
     y_center = half_length + self._y1
@@ -55,5 +99,65 @@ class Cell:
     if undo:
         fill_color = "gray"
 
+    # A move and its undo share one canvas item, whichever way it was drawn
+    a = self._index
+    b = to_cell._index
+    key = ("move", min(a, b), max(a, b))
+
     line = Line(Point(x_center, y_center), Point(x_center2, y_center2))
-    self._win.draw_line(line, fill_color)
+    self._win.draw_line(line, fill_color, key)
+
+
+class CellGrid:
+  """
+  List-of-lists style access to Cell views, so `cells[i][j]` keeps working.
+  Views are created on first access and cached, which keeps any state set
+  on them (such as drawn positions) and costs nothing for cells never asked for.
+  """
+  def __init__(self, grid, win=None):
+    self._grid = grid
+    self._win = win
+    self._views = {}
+
+  def __len__(self):
+    return self._grid.num_rows
+
+  def __getitem__(self, i):
+    if i < 0:
+      i += self._grid.num_rows
+    if not 0 <= i < self._grid.num_rows:
+      raise IndexError("cell row index out of range")
+    return _CellRow(self, i)
+
+  def __iter__(self):
+    for i in range(self._grid.num_rows):
+      yield _CellRow(self, i)
+
+  def view(self, i, j):
+    key = i * self._grid.num_cols + j
+    cell = self._views.get(key)
+    if cell is None:
+      cell = Cell(self._grid, i, j, self._win)
+      self._views[key] = cell
+    return cell
+
+
+class _CellRow:
+  def __init__(self, cells, i):
+    self._cells = cells
+    self._i = i
+
+  def __len__(self):
+    return self._cells._grid.num_cols
+
+  def __getitem__(self, j):
+    num_cols = self._cells._grid.num_cols
+    if j < 0:
+      j += num_cols
+    if not 0 <= j < num_cols:
+      raise IndexError("cell column index out of range")
+    return self._cells.view(self._i, j)
+
+  def __iter__(self):
+    for j in range(self._cells._grid.num_cols):
+      yield self._cells.view(self._i, j)
@@ -0,0 +1,192 @@
+"""
+Events describing a maze being generated and solved, and a consumer that
+draws them on a Window.
+
+Pass any callable as `Maze(..., events=sink)`, for example a queue's `put`
+or a list's `append`, and the maze reports each step as it happens:
+
+    PhaseStarted(name)      "generate" or "solve" is starting
+    WallRemoved(i, j, wall) the wall of cell (i, j) (and its neighbour's) is gone
+    Visit(i, j)             a cell is entered
+    Backtrack(i, j)         a cell is left as a dead end
+    PathFound(path)         solving finished; path is empty if there is none
+
+Events are plain tuples, so they are cheap to create, to put on a queue and
+to pickle. A maze built with `win=None` and an event sink runs at full speed
+in any thread; the GUI, a recorder or a network stream then consume the
+events at their own pace.
+"""
+
+import queue
+from typing import NamedTuple
+
+from cell import CellGrid
+from grid import Grid, DELTAS
+
+
+class PhaseStarted(NamedTuple):
+    name: str
+
+
+class WallRemoved(NamedTuple):
+    i: int
+    j: int
+    wall: int
+
+
+class Visit(NamedTuple):
+    i: int
+    j: int
+
+
+class Backtrack(NamedTuple):
+    i: int
+    j: int
+
+
+class PathFound(NamedTuple):
+    path: list
+
+
+class EventRenderer:
+    """
+    Draws a stream of maze events on a Window.
+
+    It keeps its own copy of the walls, built up from the events, so it
+    never touches the Maze producing them and can run on the GUI thread
+    while the maze is computed elsewhere.
+    """
+    def __init__(self, win, x1, y1, num_rows, num_cols, cell_size_x, cell_size_y):
+        self._win = win
+        self._x1 = x1
+        self._y1 = y1
+        self._num_rows = num_rows
+        self._num_cols = num_cols
+        self._cell_size_x = cell_size_x
+        self._cell_size_y = cell_size_y
+        self._reset()
+        self._playing = False
+
+    def _reset(self):
+        self._grid = Grid(self._num_rows, self._num_cols)
+        self._cells = CellGrid(self._grid, self._win)
+        self._solving = False
+        # Cells of the current solving route, as in the depth-first search
+        self._stack = []
+
+    def apply(self, event):
+        """Draw a single event, without redrawing the window."""
+        if isinstance(event, WallRemoved):
+            i, j, wall = event
+            di, dj = DELTAS[wall]
+            if 0 <= i + di < self._num_rows and 0 <= j + dj < self._num_cols:
+                self._grid.remove_wall(i, j, wall)
+            else:
+                # The entrance and exit open onto the outside of the grid
+                self._grid.set_wall(i, j, wall, False)
+            self._draw_cell(i, j)
+        elif isinstance(event, Visit):
+            if self._solving:
+                k = self._grid.index(*event)
+                if self._stack:
+                    self._draw_move(self._stack[-1], k)
+                self._stack.append(k)
+        elif isinstance(event, Backtrack):
+            if self._solving and self._stack:
+                k = self._stack.pop()
+                if self._stack:
+                    self._draw_move(self._stack[-1], k, True)
+        elif isinstance(event, PathFound):
+            # Solvers other than the depth-first search only report the result
+            route = [self._grid.index(i, j) for i, j in event.path]
+            if route != self._stack:
+                for k, next_k in zip(route, route[1:]):
+                    self._draw_move(k, next_k)
+            self._solving = False
+        elif isinstance(event, PhaseStarted):
+            if event.name == "generate":
+                self._reset()
+                for i in range(self._num_rows):
+                    for j in range(self._num_cols):
+                        self._draw_cell(i, j)
+            else:
+                self._solving = True
+                self._stack = []
+
+    def show(self, walls, route=(), solving=False):
+        """
+        Replace whatever is drawn with a snapshot: the wall bytes of every
+        cell and the cell indices of the solving route so far.
+        """
+        self._win.clear_canvas()
+        self._reset()
+        self._grid.walls[:] = walls
+        for i in range(self._num_rows):
+            for j in range(self._num_cols):
+                self._draw_cell(i, j)
+        self._stack = list(route)
+        self._solving = solving
+        for k, next_k in zip(self._stack, self._stack[1:]):
+            self._draw_move(k, next_k)
+        self._win.redraw()
+
+    def redraw(self):
+        self._win.redraw()
+
+    def after(self, delay_ms, callback):
+        return self._win.after(delay_ms, callback)
+
+    def drain(self, source, limit=None):
+        """
+        Apply up to `limit` events (all of them if None) waiting on the
+        queue `source` without blocking, then redraw once.
+        Returns how many events were applied.
+        """
+        count = 0
+        while limit is None or count < limit:
+            try:
+                event = source.get_nowait()
+            except queue.Empty:
+                break
+            self.apply(event)
+            count += 1
+        if count:
+            self._win.redraw()
+        return count
+
+    def play(self, source, fps=30, events_per_frame=None):
+        """
+        Drain `source` on the window's own timer, `fps` times a second,
+        until stop() is called. Returns immediately; the Tk main loop does
+        the rest.
+        """
+        self._playing = True
+        delay = max(1, int(1000 / fps))
+
+        def frame():
+            if not self._playing:
+                return
+            self.drain(source, events_per_frame)
+            self._win.after(delay, frame)
+
+        frame()
+
+    def stop(self):
+        self._playing = False
+
+    def _cell_bounds(self, i, j):
+        x1 = self._x1 + j * self._cell_size_x
+        y1 = self._y1 + i * self._cell_size_y
+        return x1, y1, x1 + self._cell_size_x, y1 + self._cell_size_y
+
+    def _draw_cell(self, i, j):
+        self._cells[i][j].draw(*self._cell_bounds(i, j))
+
+    def _draw_move(self, k, next_k, undo=False):
+        cols = self._num_cols
+        cell = self._cells[k // cols][k % cols]
+        to_cell = self._cells[next_k // cols][next_k % cols]
+        for c, index in ((cell, k), (to_cell, next_k)):
+            if c._x1 is None:
+                c.place(*self._cell_bounds(index // cols, index % cols))
+        cell.draw_move(to_cell, undo)
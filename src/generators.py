@@ -0,0 +1,380 @@
+"""
+Maze generation algorithms that carve passages directly into a Grid.
+
+Each generator takes a grid with all interior walls standing and a random
+number source, and removes walls until the grid is a perfect maze: every
+cell is reachable from every other cell by exactly one route. Walls are only
+ever removed, so openings carved beforehand (the entrance and exit) survive.
+braid() can afterwards open up dead ends to give the maze loops.
+"""
+
+import os
+import random
+
+from grid import Grid, TOP, RIGHT, BOTTOM, LEFT, ALL_WALLS
+
+
+def _carve(walls, k, next_k, cols):
+    # Remove the wall between two neighbouring cell indices. Vertical moves
+    # are checked first: with a single column, k + 1 is the cell below
+    if next_k == k + cols:
+        walls[k] &= ~BOTTOM
+        walls[next_k] &= ~TOP
+    elif next_k == k - cols:
+        walls[k] &= ~TOP
+        walls[next_k] &= ~BOTTOM
+    elif next_k == k + 1:
+        walls[k] &= ~RIGHT
+        walls[next_k] &= ~LEFT
+    else:
+        walls[k] &= ~LEFT
+        walls[next_k] &= ~RIGHT
+
+
+def _neighbours(k, rows, cols):
+    # All in-bounds neighbours of a cell index, walls or not
+    i, j = divmod(k, cols)
+    result = []
+    if i > 0:
+        result.append(k - cols)
+    if j < cols - 1:
+        result.append(k + 1)
+    if i < rows - 1:
+        result.append(k + cols)
+    if j > 0:
+        result.append(k - 1)
+    return result
+
+
+def kruskal(grid, rng):
+    """Randomised Kruskal: join cells along shuffled walls using union-find."""
+    rows = grid.num_rows
+    cols = grid.num_cols
+
+    # Edge e joins cell e // 2 to its right (e even) or lower (e odd) neighbour
+    edges = [2 * k for k in range(rows * cols) if (k + 1) % cols]
+    edges += [2 * k + 1 for k in range((rows - 1) * cols)]
+    rng.shuffle(edges)
+    join_edges(grid, edges)
+
+
+def join_edges(grid, edges):
+    """
+    Open walls along `edges` in order, skipping any that would make a loop.
+    Edge e joins cell e // 2 to its right (e even) or lower (e odd) neighbour.
+    """
+    rows = grid.num_rows
+    cols = grid.num_cols
+    walls = grid.walls
+    parent = list(range(rows * cols))
+
+    def find(k):
+        # Path halving keeps the trees shallow
+        while parent[k] != k:
+            parent[k] = parent[parent[k]]
+            k = parent[k]
+        return k
+
+    remaining = rows * cols - 1
+    for edge in edges:
+        if remaining == 0:
+            break
+        k = edge >> 1
+        next_k = k + cols if edge & 1 else k + 1
+        root_a = find(k)
+        root_b = find(next_k)
+        if root_a != root_b:
+            parent[root_a] = root_b
+            _carve(walls, k, next_k, cols)
+            remaining -= 1
+
+
+def prim(grid, rng):
+    """Randomised Prim: grow the maze from a random frontier cell at a time."""
+    rows = grid.num_rows
+    cols = grid.num_cols
+    walls = grid.walls
+
+    # 0 outside, 1 on the frontier, 2 in the maze
+    state = bytearray(rows * cols)
+    start = rng.randrange(rows * cols)
+    state[start] = 2
+    frontier = []
+    for next_k in _neighbours(start, rows, cols):
+        state[next_k] = 1
+        frontier.append(next_k)
+
+    while frontier:
+        # Remove a random frontier cell in O(1) by swapping with the last one
+        index = rng.randrange(len(frontier))
+        frontier[index], frontier[-1] = frontier[-1], frontier[index]
+        k = frontier.pop()
+
+        inside = []
+        for next_k in _neighbours(k, rows, cols):
+            if state[next_k] == 2:
+                inside.append(next_k)
+            elif state[next_k] == 0:
+                state[next_k] = 1
+                frontier.append(next_k)
+        _carve(walls, k, inside[rng.randrange(len(inside))], cols)
+        state[k] = 2
+
+
+def eller_rows(num_rows, num_cols, rng):
+    """
+    Eller's algorithm, yielding each finished row of wall bits in turn.
+    Only the current row's set labels are kept, so memory is O(num_cols)
+    however many rows are generated.
+    """
+    next_set = 0
+    # Set label of each column carried down from the row above, or None
+    carried = [None] * num_cols
+
+    for i in range(num_rows):
+        last_row = i == num_rows - 1
+        row = bytearray([ALL_WALLS]) * num_cols
+
+        # Cells reached from above keep their set, the rest start a new one
+        labels = []
+        members = {}
+        for j in range(num_cols):
+            label = carried[j]
+            if label is None:
+                label = next_set
+                next_set += 1
+            else:
+                row[j] &= ~TOP
+            labels.append(label)
+            members.setdefault(label, []).append(j)
+
+        # Randomly join neighbours in different sets; join all on the last row
+        for j in range(num_cols - 1):
+            a = labels[j]
+            b = labels[j + 1]
+            if a == b or not (last_row or rng.random() < 0.5):
+                continue
+            row[j] &= ~RIGHT
+            row[j + 1] &= ~LEFT
+            # Relabel the smaller set
+            if len(members[a]) < len(members[b]):
+                a, b = b, a
+            for column in members[b]:
+                labels[column] = a
+            members[a].extend(members.pop(b))
+
+        # Every set carries on downwards through at least one cell
+        carried = [None] * num_cols
+        if not last_row:
+            for label, columns in members.items():
+                down = [column for column in columns if rng.random() < 0.5]
+                if not down:
+                    down = [columns[rng.randrange(len(columns))]]
+                for column in down:
+                    row[column] &= ~BOTTOM
+                    carried[column] = label
+
+        yield row
+
+
+def eller(grid, rng):
+    """Eller's algorithm, building the maze one row at a time."""
+    cols = grid.num_cols
+    walls = grid.walls
+    for i, row in enumerate(eller_rows(grid.num_rows, cols, rng)):
+        base = i * cols
+        for j in range(cols):
+            walls[base + j] &= row[j]
+
+
+def wilson(grid, rng):
+    """Wilson's algorithm: loop-erased random walks, giving an unbiased maze."""
+    rows = grid.num_rows
+    cols = grid.num_cols
+    size = rows * cols
+    walls = grid.walls
+
+    in_maze = bytearray(size)
+    in_maze[rng.randrange(size)] = 1
+    # Where the walk last left each cell; revisiting a cell overwrites it,
+    # which erases the loop
+    exit_to = [0] * size
+
+    for start in range(size):
+        if in_maze[start]:
+            continue
+
+        # Random walk until the maze is hit
+        k = start
+        while not in_maze[k]:
+            options = _neighbours(k, rows, cols)
+            next_k = options[rng.randrange(len(options))]
+            exit_to[k] = next_k
+            k = next_k
+
+        # Add the loop-erased walk to the maze
+        k = start
+        while not in_maze[k]:
+            in_maze[k] = 1
+            _carve(walls, k, exit_to[k], cols)
+            k = exit_to[k]
+
+
+def binary_tree(grid, rng):
+    """Binary tree: every cell opens either up or left."""
+    rows = grid.num_rows
+    cols = grid.num_cols
+    walls = grid.walls
+    for i in range(rows):
+        for j in range(cols):
+            k = i * cols + j
+            if i > 0 and (j == 0 or rng.random() < 0.5):
+                _carve(walls, k, k - cols, cols)
+            elif j > 0:
+                _carve(walls, k, k - 1, cols)
+
+
+def sidewinder(grid, rng):
+    """Sidewinder: runs along each row, each run opening upwards once."""
+    rows = grid.num_rows
+    cols = grid.num_cols
+    walls = grid.walls
+
+    # The top row is a single corridor
+    for j in range(cols - 1):
+        _carve(walls, j, j + 1, cols)
+
+    for i in range(1, rows):
+        run_start = i * cols
+        for j in range(cols):
+            k = i * cols + j
+            if j == cols - 1 or rng.random() < 0.5:
+                # Close the run by opening one of its cells upwards
+                chosen = rng.randrange(run_start, k + 1)
+                _carve(walls, chosen, chosen - cols, cols)
+                run_start = k + 1
+            else:
+                _carve(walls, k, k + 1, cols)
+
+
+def _wall_towards(k, next_k, cols):
+    # The wall of cell k facing its neighbour next_k, vertical first as in _carve
+    if next_k == k + cols:
+        return BOTTOM
+    if next_k == k - cols:
+        return TOP
+    if next_k == k + 1:
+        return RIGHT
+    return LEFT
+
+
+def braid(grid, rng, fraction):
+    """
+    Remove about `fraction` (0 to 1) of the dead ends by opening one more
+    wall in each, which adds loops so there are many routes between cells.
+    A dead end is opened towards another dead end where there is one, so
+    both go at once. Returns the opened walls as (i, j, wall).
+    """
+    rows = grid.num_rows
+    cols = grid.num_cols
+    walls = grid.walls
+
+    def passages(k):
+        return [next_k for next_k in _neighbours(k, rows, cols)
+                if not walls[k] & _wall_towards(k, next_k, cols)]
+
+    dead_ends = [k for k in range(rows * cols) if len(passages(k)) == 1]
+    rng.shuffle(dead_ends)
+    opened = []
+    for k in dead_ends:
+        # Earlier openings may already have removed this dead end
+        if len(passages(k)) != 1 or rng.random() >= fraction:
+            continue
+        closed = [next_k for next_k in _neighbours(k, rows, cols)
+                  if walls[k] & _wall_towards(k, next_k, cols)]
+        if not closed:
+            continue
+        best = [next_k for next_k in closed if len(passages(next_k)) == 1] or closed
+        next_k = best[rng.randrange(len(best))]
+        _carve(walls, k, next_k, cols)
+        opened.append((k // cols, k % cols, _wall_towards(k, next_k, cols)))
+    if opened:
+        grid.mark_changed()
+    return opened
+
+
+def _build_tile(num_rows, num_cols, generator, seed):
+    # Generate one tile as a maze of its own; runs in a worker process
+    grid = Grid(num_rows, num_cols)
+    GENERATORS[generator](grid, random.Random(seed))
+    return bytes(grid.walls)
+
+
+def tiled(grid, rng, tile_size=256, generator="kruskal", workers=None):
+    """
+    Cut the grid into tile_size x tile_size tiles, generate every tile as a
+    perfect maze of its own with `generator` across `workers` processes
+    (default: all cores), then join the tiles along a random spanning tree
+    of the tiles, opening one wall between each pair of tiles it joins.
+    Every tile is a tree and so is the way they are joined, so the whole
+    maze is perfect. A seed gives the same maze however many workers run.
+    """
+    rows = grid.num_rows
+    cols = grid.num_cols
+    walls = grid.walls
+    tile_rows = -(-rows // tile_size)
+    tile_cols = -(-cols // tile_size)
+
+    # Tile seeds are drawn up front, so the result doesn't depend on scheduling
+    tiles = []
+    for a in range(tile_rows):
+        for b in range(tile_cols):
+            tiles.append((min(tile_size, rows - a * tile_size), min(tile_size, cols - b * tile_size),
+                          generator, rng.getrandbits(64)))
+
+    workers = min(workers or os.cpu_count() or 1, len(tiles))
+    if workers == 1:
+        built = [_build_tile(*tile) for tile in tiles]
+    else:
+        # Imported here, so the other generators don't load multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            built = list(executor.map(_build_tile, *zip(*tiles)))
+
+    # Copy each tile in row by row; AND-ing keeps openings made beforehand
+    for index, tile_walls in enumerate(built):
+        a, b = divmod(index, tile_cols)
+        width = tiles[index][1]
+        for r in range(tiles[index][0]):
+            start = (a * tile_size + r) * cols + b * tile_size
+            row = int.from_bytes(walls[start:start + width], "little")
+            row &= int.from_bytes(tile_walls[r * width:(r + 1) * width], "little")
+            walls[start:start + width] = row.to_bytes(width, "little")
+
+    # A random spanning tree over the tiles says which neighbours to join
+    tree = Grid(tile_rows, tile_cols)
+    kruskal(tree, rng)
+    for a in range(tile_rows):
+        for b in range(tile_cols):
+            opening = tree.walls[a * tile_cols + b]
+            if b < tile_cols - 1 and not opening & RIGHT:
+                i = rng.randrange(a * tile_size, min((a + 1) * tile_size, rows))
+                k = i * cols + (b + 1) * tile_size - 1
+                _carve(walls, k, k + 1, cols)
+            if a < tile_rows - 1 and not opening & BOTTOM:
+                j = rng.randrange(b * tile_size, min((b + 1) * tile_size, cols))
+                k = ((a + 1) * tile_size - 1) * cols + j
+                _carve(walls, k, k + cols, cols)
+
+
+# Generators selectable by name through Maze(generator=...), besides the
+# animated "backtracker" in Maze itself
+GENERATORS = {
+    "kruskal": kruskal,
+    "prim": prim,
+    "eller": eller,
+    "wilson": wilson,
+    "binary_tree": binary_tree,
+    "sidewinder": sidewinder,
+    "tiled": tiled,
+}
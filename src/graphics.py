@@ -1,7 +1,9 @@
-from tkinter import Tk, BOTH, Canvas, Frame, Label, Button, StringVar
+# tkinter is only imported once a Window is made, so headless code that
+# imports this module (through cell.py, say) never loads Tk
 
 class Window:
   def __init__(self, width, height) -> None:
+    from tkinter import Tk, BOTH, Canvas
     self.__root = Tk()
     self.__root.title("Maze Game")
     self.__root.geometry(f"{width}x{height}")
@@ -15,7 +17,11 @@ class Window:
                             width=width, 
                             height=height)
     self.__canvas.pack(fill=BOTH, expand=1)
-    self.__is_running = False
+    # Stays True until the window is closed
+    self.__is_running = True
+
+    # Canvas item of every keyed line, so redraws update it in place
+    self.__items = {}
     
     self.__popup_frame = None
     self.__restart_callback = None
@@ -24,20 +30,73 @@ class Window:
     self.__root.update_idletasks()
     self.__root.update()
 
+  def after(self, delay_ms, callback):
+    """Call `callback` from the Tk main loop after `delay_ms` milliseconds."""
+    return self.__root.after(delay_ms, callback)
+
   def wait_for_close(self):
-    self.__is_running = True
-    while self.__is_running:
-      self.redraw()
+    """
+    Run the Tk main loop until the window is closed. Work scheduled with
+    after() keeps running, and the loop sleeps while there is nothing to do.
+    """
+    if self.__is_running:
+      self.__root.mainloop()
   
-  def draw_line(self, line, fill_color="black"):
-    line.draw(self.__canvas, fill_color)
+  def draw_line(self, line, fill_color="black", key=None):
+    """
+    Draw a line. Lines drawn with a key are kept on the canvas: drawing
+    the same key again only changes its colour instead of adding a new item.
+    """
+    if key is None:
+      line.draw(self.__canvas, fill_color)
+      return
+
+    item = self.__items.get(key)
+    if item is None:
+      self.__items[key] = line.draw(self.__canvas, fill_color)
+    else:
+      self.__canvas.itemconfig(item, fill=fill_color)
+
+  def draw_segments(self, segments, fill_color="black"):
+    """
+    Draw many (x1, y1, x2, y2) segments in one batch,
+    redrawing the window only once at the end.
+    """
+    # Replace the segments of any earlier batch
+    self.__canvas.delete("segments")
+    create_line = self.__canvas.create_line
+    for x1, y1, x2, y2 in segments:
+      create_line(x1, y1, x2, y2, fill=fill_color, width=2, tags="segments")
+    self.redraw()
+
+  def make_image(self, data):
+    """Create a Tk image from PPM/PGM data."""
+    from tkinter import PhotoImage
+    return PhotoImage(master=self.__root, data=data, format="PPM")
+
+  def draw_images(self, placements):
+    """
+    Show (x, y, image) placements, top-left anchored, in place of those
+    drawn by the previous call, then redraw once.
+    """
+    self.__canvas.delete("images")
+    create_image = self.__canvas.create_image
+    for x, y, image in placements:
+      create_image(x, y, image=image, anchor="nw", tags="images")
+    self.redraw()
+
+  def bind(self, sequence, callback):
+    """Call `callback` with the Tk event for canvas events matching `sequence`."""
+    self.__canvas.bind(sequence, callback)
 
   def close(self):
     self.__is_running = False
+    self.__root.quit()
     
   def clear_canvas(self):
     """Clear all items from the canvas"""
     self.__canvas.delete("all")
+    self.__items.clear()
     
   def show_popup(self, message, restart_callback=None):
     """
@@ -47,6 +106,7 @@ class Window:
         message: The message to display in the popup
         restart_callback: Function to call when the restart button is clicked
     """
+    from tkinter import Frame, Label, Button
     self.__restart_callback = restart_callback
     
     # Create popup frame with a slight shadow effect and more visible border
@@ -131,8 +191,8 @@ class Line:
     self.p1 = p1
     self.p2 = p2
 
-  def draw(self, canvas: Canvas, fill_color="black"):
-    canvas.create_line(self.p1.x, 
+  def draw(self, canvas: "Canvas", fill_color="black"):
+    return canvas.create_line(self.p1.x, 
                        self.p1.y, 
                        self.p2.x, 
                        self.p2.y, 
@@ -0,0 +1,160 @@
+"""
+Compact storage for maze walls and visited flags.
+
+Every cell is one byte in `walls`, using one bit per side, and one byte in
+`visited`. Cells are stored row by row, so cell (i, j) lives at index
+i * num_cols + j.
+"""
+
+# Wall bits
+TOP = 1
+RIGHT = 2
+BOTTOM = 4
+LEFT = 8
+ALL_WALLS = TOP | RIGHT | BOTTOM | LEFT
+
+# The wall on the neighbouring cell that faces each wall
+OPPOSITE = {TOP: BOTTOM, RIGHT: LEFT, BOTTOM: TOP, LEFT: RIGHT}
+
+# Row and column offsets of the neighbour behind each wall
+DELTAS = {TOP: (-1, 0), RIGHT: (0, 1), BOTTOM: (1, 0), LEFT: (0, -1)}
+
+
+class Grid:
+    def __init__(self, num_rows, num_cols, walls=None):
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        size = num_rows * num_cols
+
+        # All walls start standing unless an existing buffer is given
+        if walls is None:
+            walls = bytearray([ALL_WALLS]) * size
+        self.walls = walls
+        self.visited = bytearray(size)
+        # Optional cost of entering each cell, a sequence of positive
+        # integers; None means every step costs one
+        self.weights = None
+
+        # Bumped whenever walls change after generation, so anything cached
+        # from the walls knows to recompute. Code writing to `walls` directly
+        # must call mark_changed() itself.
+        self.version = 0
+
+    def index(self, i, j):
+        return i * self.num_cols + j
+
+    def has_wall(self, i, j, wall):
+        return bool(self.walls[i * self.num_cols + j] & wall)
+
+    def mark_changed(self):
+        self.version += 1
+
+    def set_wall(self, i, j, wall, present):
+        """Set or clear a single wall bit of cell (i, j) only."""
+        k = i * self.num_cols + j
+        if present:
+            self.walls[k] |= wall
+        else:
+            self.walls[k] &= ~wall & ALL_WALLS
+        self.version += 1
+
+    def remove_wall(self, i, j, wall):
+        """Remove a wall of cell (i, j) and the matching wall of its neighbour."""
+        cols = self.num_cols
+        di, dj = DELTAS[wall]
+        self.walls[i * cols + j] &= ~wall & ALL_WALLS
+        self.walls[(i + di) * cols + j + dj] &= ~OPPOSITE[wall] & ALL_WALLS
+        self.version += 1
+
+    def count_passages(self):
+        """Count the open walls between neighbouring cells inside the grid."""
+        walls = self.walls
+        if isinstance(walls, memoryview):
+            walls = walls.tobytes()
+        elif not isinstance(walls, (bytes, bytearray)):
+            walls = walls[:]
+        cols = self.num_cols
+        # Count open right walls except on the right edge, and open bottom
+        # walls except along the bottom edge
+        right_open = walls.translate(_OPEN_RIGHT).count(1) - walls[cols - 1::cols].translate(_OPEN_RIGHT).count(1)
+        bottom_open = walls[:len(walls) - cols].translate(_OPEN_BOTTOM).count(1)
+        return right_open + bottom_open
+
+    def reset_visited(self):
+        # Clear every visited flag in one operation
+        self.visited[:] = bytes(len(self.visited))
+
+
+# Byte translation tables marking cells with an open right or bottom wall
+_OPEN_RIGHT = bytes(0 if b & RIGHT else 1 for b in range(256))
+_OPEN_BOTTOM = bytes(0 if b & BOTTOM else 1 for b in range(256))
+
+# Byte translation tables for packing two cells' walls into one byte
+_LOW_NIBBLE = bytes(b & 0x0F for b in range(256))
+_HIGH_NIBBLE = bytes(b >> 4 for b in range(256))
+_TO_HIGH_NIBBLE = bytes((b << 4) & 0xFF for b in range(256))
+
+
+def pack_walls(walls):
+    """Pack one-byte-per-cell walls into bytes holding two cells each, low nibble first."""
+    if isinstance(walls, PackedWalls):
+        return walls.packed()
+
+    low = bytes(walls[0::2])
+    high = bytes(walls[1::2]).ljust(len(low), b"\0").translate(_TO_HIGH_NIBBLE)
+    # OR-ing the two halves as big integers is far faster than a per-byte loop
+    combined = int.from_bytes(low, "little") | int.from_bytes(high, "little")
+    return combined.to_bytes(len(low), "little")
+
+
+def unpack_walls(packed, size):
+    """Expand packed walls back into a bytearray with one byte per cell."""
+    packed = bytes(packed)
+    walls = bytearray(size)
+    walls[0::2] = packed.translate(_LOW_NIBBLE)[:(size + 1) // 2]
+    walls[1::2] = packed.translate(_HIGH_NIBBLE)[:size // 2]
+    return walls
+
+
+class PackedWalls:
+    """
+    Wall bits for `size` cells stored two per byte in an existing buffer,
+    such as a memory-mapped file. Indexing reads and writes one cell's bits
+    in place, so the buffer is never copied into Python objects.
+    """
+    def __init__(self, buffer, offset, size):
+        self._buffer = buffer
+        self._offset = offset
+        self._size = size
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            # Unpack just the bytes covering a contiguous range of cells
+            start, stop, step = k.indices(self._size)
+            if step != 1:
+                raise ValueError("PackedWalls slices must be contiguous")
+            first = self._offset + (start >> 1)
+            last = self._offset + ((stop + 1) >> 1)
+            cells = unpack_walls(self._buffer[first:last], 2 * (last - first))
+            skip = start & 1
+            return cells[skip:skip + max(stop - start, 0)]
+
+        byte = self._buffer[self._offset + (k >> 1)]
+        return byte >> 4 if k & 1 else byte & 0x0F
+
+    def __setitem__(self, k, value):
+        position = self._offset + (k >> 1)
+        byte = self._buffer[position]
+        if k & 1:
+            self._buffer[position] = (byte & 0x0F) | ((value & 0x0F) << 4)
+        else:
+            self._buffer[position] = (byte & 0xF0) | (value & 0x0F)
+
+    def packed(self):
+        return bytes(self._buffer[self._offset:self._offset + (self._size + 1) // 2])
+
+    def unpack(self):
+        return unpack_walls(self.packed(), self._size)
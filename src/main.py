@@ -1,53 +1,105 @@
+import queue
+import threading
 from graphics import Window
 from maze import Maze
+from events import EventRenderer
+
+# How often the window takes new events from the worker
+FRAME_MS = 33
+
+class Cancelled(Exception):
+    """Raised inside the worker when the maze it is working on is no longer wanted."""
 
 def main():
+    # The cancel flag of the maze being worked on, if any
+    current = None
+
     # Create a function to hold all maze creation and solving logic
     # so it can be restarted
     def create_and_solve_maze():
-        nonlocal win
-        
+        nonlocal current
+
         num_rows = 12
         num_cols = 12
         margin = 50
-        
+
         screen_x = 800
         screen_y = 600
-        
+
         cell_size_x = (screen_x - 2 * margin) / num_cols
         cell_size_y = (screen_y - 2 * margin) / num_rows
-        
-        # Use seed=None for random maze every time
-        # Use a specific value (e.g., seed=42) for consistent maze generation during debugging
-        maze = Maze(margin, margin, num_rows, num_cols, cell_size_x, cell_size_y, win, seed=None)
-        
-        # Solve the maze
-        is_solved = maze.solve()
-        
-        # Instead of printing to console, show the result in a popup
-        if is_solved:
-            win.show_popup("🎉 Success! 🎉\nMaze solved successfully!\nClick Restart to generate a new maze.", restart_game)
-        else:
-            win.show_popup("❌ Oops! ❌\nCould not solve the maze.\nClick Restart to try a different maze.", restart_game)
-    
+
+        cancelled = threading.Event()
+        current = cancelled
+        events = queue.SimpleQueue()
+        outcome = queue.SimpleQueue()
+
+        def emit(event):
+            # Stop the worker at its next step once the maze is abandoned
+            if cancelled.is_set():
+                raise Cancelled
+            events.put(event)
+
+        def work():
+            # Generate and solve without touching the window; the GUI thread
+            # draws the events as they arrive
+            try:
+                # Use seed=None for random maze every time
+                # Use a specific value (e.g., seed=42) for consistent maze generation during debugging
+                maze = Maze(margin, margin, num_rows, num_cols, cell_size_x, cell_size_y,
+                            seed=None, events=emit)
+                outcome.put(bool(maze.solve()))
+            except Cancelled:
+                pass
+
+        threading.Thread(target=work, daemon=True).start()
+
+        renderer = EventRenderer(win, margin, margin, num_rows, num_cols, cell_size_x, cell_size_y)
+        # A few steps per frame animates small mazes; big ones draw more per frame
+        events_per_frame = max(2, num_rows * num_cols // 100)
+
+        def poll():
+            if cancelled.is_set():
+                return
+            # Check for the result first: once it is there, every event is queued
+            finished = not outcome.empty()
+            renderer.drain(events, events_per_frame)
+            if not finished or not events.empty():
+                win.after(FRAME_MS, poll)
+                return
+
+            # Instead of printing to console, show the result in a popup
+            if outcome.get():
+                win.show_popup("🎉 Success! 🎉\nMaze solved successfully!\nClick Restart to generate a new maze.", restart_game)
+            else:
+                win.show_popup("❌ Oops! ❌\nCould not solve the maze.\nClick Restart to try a different maze.", restart_game)
+
+        poll()
+
     # Function to restart the game when the button is clicked
     def restart_game():
+        # Abandon any maze still being worked on
+        if current is not None:
+            current.set()
+
         # Clear the canvas before restarting
         win.clear_canvas()
-        
+
         # Create and solve a new maze
         create_and_solve_maze()
-    
+
     # Create the main window
     screen_x = 800
     screen_y = 600
     win = Window(screen_x, screen_y)
-    
+
     # Create and solve the initial maze
     create_and_solve_maze()
-    
-    # Wait for the window to close
+
+    # Run the window until it is closed; the maze is worked on in the background
     win.wait_for_close()
+    if current is not None:
+        current.set()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,6 +1,15 @@
-import time
 import random
-from cell import Cell
+import time
+from array import array
+from animation import Animation
+from stats import Stats, check_hooks
+from events import PhaseStarted, WallRemoved, Visit, Backtrack, PathFound
+from cell import CellGrid
+from grid import Grid, TOP, RIGHT, BOTTOM, LEFT
+from solvers import SOLVERS, SolveResult, distance_field
+from generators import GENERATORS, eller_rows, braid as braid_walls
+from mazefile import save_grid, load_grid
+from render import wall_segments, save_image
 
 class Maze:
     def __init__(
@@ -12,8 +21,52 @@ class Maze:
             cell_size_x,
             cell_size_y,
             win=None,
-            seed=None
+            seed=None,
+            generator="backtracker",
+            animation=None,
+            backend="python",
+            stats=False,
+            hooks=None,
+            events=None,
+            braid=0.0,
+            weights=None
         ):
+        if generator != "backtracker" and generator not in GENERATORS:
+            raise ValueError(f"Unknown maze generator: {generator!r}")
+        if not 0 <= braid <= 1:
+            raise ValueError("braid must be between 0 and 1")
+        if weights is not None:
+            if len(weights) != num_rows * num_cols:
+                raise ValueError("weights needs one entry per cell")
+            try:
+                weights = array("l", weights)
+            except (TypeError, OverflowError):
+                raise ValueError("weights must be positive integers") from None
+            if min(weights) < 1:
+                raise ValueError("weights must be positive")
+        self._setup(x1, y1, num_rows, num_cols, cell_size_x, cell_size_y, win, seed, generator,
+                    animation, backend, stats, hooks, events)
+        
+        # Drawing every cell, then about two draws per cell while carving
+        started = time.perf_counter()
+        if events is not None:
+            events(PhaseStarted("generate"))
+        self._animation.begin(3 * num_rows * num_cols)
+        self._create_cells()
+        self._break_entrance_and_exit()
+        self._break_walls()
+        if braid:
+            self._braid(braid)
+        self._grid.weights = weights
+        self._animation.finish(self._win)
+        self._reset_cells_visited()
+        self._end_phase("generate", started)
+    
+    def _setup(self, x1, y1, num_rows, num_cols, cell_size_x, cell_size_y, win, seed, generator,
+               animation, backend, stats, hooks, events):
+        # The state every maze starts from, whether generated or wrapping a grid
+        if backend not in ("python", "numpy"):
+            raise ValueError(f"Unknown backend: {backend!r}")
         self._x1 = x1
         self._y1 = y1
         self._num_rows = num_rows
@@ -21,98 +74,394 @@ class Maze:
         self._cell_size_x = cell_size_x
         self._cell_size_y = cell_size_y
         self._win = win
+        self._seed = seed
+        self._generator = generator
+        self._backend = backend
+        self._animation = animation if animation is not None else Animation()
+        self._grid = None
         self._cells = []
+        self._exit_field = None
+        self.stats = Stats() if stats else None
+        self._hooks = check_hooks(hooks)
+        # Callable receiving the events from events.py, e.g. a queue's put
+        self._events = events
         
-        if seed is not None:
-            random.seed(seed)
-        
-        self._create_cells()
-        self._break_entrance_and_exit()
-        self._break_walls()
-        self._reset_cells_visited()
+        # Each maze owns its random generator, so mazes built concurrently
+        # don't disturb each other or the global random state
+        self._rng = random.Random(seed)
+    
+    def save(self, path):
+        """Save the maze walls, seed and generator in the binary format from mazefile.py."""
+        save_grid(path, self._grid, self._seed, self._generator)
     
-    def solve(self):
+    @classmethod
+    def load(cls, path, x1=0, y1=0, cell_size_x=10, cell_size_y=10, win=None, animation=None,
+             backend="python", stats=False, hooks=None, events=None):
         """
-        Solve the maze using a depth-first algorithm.
-        Returns True if the maze was solved, False otherwise.
+        Load a maze saved with save().
+        The file is memory-mapped rather than read, so even huge mazes open
+        instantly and solvers read the walls straight from the mapping.
         """
-        # Reset visited flags before solving
-        self._reset_cells_visited()
-        # Start solving from the entrance cell (top-left)
-        return self._solve_r(0, 0)
+        grid, seed, generator = load_grid(path)
+        return cls.from_grid(grid, x1, y1, cell_size_x, cell_size_y, win, animation, backend,
+                             seed=seed, generator=generator, stats=stats, hooks=hooks, events=events)
     
-    def _solve_r(self, i, j):
+    @classmethod
+    def from_grid(cls, grid, x1=0, y1=0, cell_size_x=10, cell_size_y=10, win=None, animation=None,
+                  backend="python", seed=None, generator="", stats=False, hooks=None, events=None):
         """
-        Recursive helper method for solving the maze.
-        Returns True if the current cell is the end cell or leads to it.
-        Returns False if the current cell is a dead end.
+        Wrap an existing Grid in a Maze without generating anything, for
+        walls that were loaded or shared from elsewhere. The grid is used
+        as is, not copied.
         """
-        # Animate the solving process
-        self._animate()
+        # Skip __init__, which would generate a new maze
+        maze = cls.__new__(cls)
+        maze._setup(x1, y1, grid.num_rows, grid.num_cols, cell_size_x, cell_size_y, win, seed,
+                    generator, animation, backend, stats, hooks, events)
+        maze._grid = grid
+        maze._cells = CellGrid(grid, win)
         
-        # Mark the current cell as visited
-        self._cells[i][j].visited = True
+        # Draw each cell
+        if win is not None:
+            maze._animation.begin(maze._num_rows * maze._num_cols)
+            for i in range(maze._num_rows):
+                for j in range(maze._num_cols):
+                    maze._draw_cell(i, j)
+            maze._animation.finish(win)
+        return maze
+    
+    def render(self, win=None):
+        """
+        Draw the whole maze in one batch instead of cell by cell.
+        Only standing walls are drawn, merged into long straight runs, and
+        the window is redrawn once. Passing `win` attaches the maze to that
+        window first, so a maze built headless can be shown and solved on it.
+        """
+        if win is not None:
+            self._win = win
+            self._cells = CellGrid(self._grid, win)
+        if self._win is None:
+            return
         
-        # If we reached the end cell (bottom-right), we solved the maze
-        if i == self._num_rows - 1 and j == self._num_cols - 1:
-            return True
+        segments = wall_segments(
+            self._grid, self._x1, self._y1, self._cell_size_x, self._cell_size_y
+        )
+        self._win.draw_segments(segments)
+        if self.stats is not None:
+            self.stats.draw_calls += len(segments)
+    
+    def export_image(self, path, cell_px=10):
+        """Write the maze to a PNG or PPM file (by extension) without using Tk."""
+        save_image(path, self._grid, cell_px)
+    
+    def viewport(self, win, width=800, height=600, **options):
+        """
+        Show the maze on `win` through a Viewport with zoom and pan, which
+        only draws the part in view. Suited to mazes far too big for
+        render(); `options` are passed on to Viewport.
+        """
+        # Imported on first use, like the other optional parts below
+        from viewport import Viewport
+        view = Viewport(win, self._grid, width, height, **options)
+        view.draw()
+        return view
+    
+    @staticmethod
+    def stream_rows(num_rows, num_cols, seed=None):
+        """
+        Generate a maze one finished row at a time with Eller's algorithm.
+        Yields a bytearray of wall bits (see grid.py) per row, top to bottom,
+        with the entrance and exit carved like _break_entrance_and_exit does.
+        Memory stays proportional to num_cols however tall the maze is, and
+        the same seed always yields the same rows.
+        """
+        # A private generator keeps the stream reproducible and leaves the
+        # global random state alone
+        rng = random.Random(seed)
+        for i, row in enumerate(eller_rows(num_rows, num_cols, rng)):
+            # Break the top wall of the entrance cell (top-left)
+            if i == 0:
+                row[0] &= ~TOP
+            # Break the bottom wall of the exit cell (bottom-right)
+            if i == num_rows - 1:
+                row[num_cols - 1] &= ~BOTTOM
+            yield row
+    
+    def solve(self, algorithm="dfs", start=None, goal=None):
+        """
+        Solve the maze from `start` to `goal`, given as (row, col) and
+        defaulting to the entrance (top-left) and exit (bottom-right).
+        `algorithm` is "dfs" (the animated depth-first search) or one of the
+        names in solvers.SOLVERS: "bfs", "astar", "dijkstra", "bidirectional",
+        "dead_end". Only "astar" and "dijkstra" look for the cheapest path
+        when the maze has weights.
+        Returns a SolveResult holding the path as (row, col) coordinates, the
+        number of cells expanded and the path's cost (the total weight of the
+        cells entered, or the number of steps without weights). It is truthy
+        if the maze was solved.
+        """
+        if algorithm != "dfs" and algorithm not in SOLVERS:
+            raise ValueError(f"Unknown solver algorithm: {algorithm!r}")
+        start = self._check_cell(start if start is not None else (0, 0))
+        goal = self._check_cell(goal if goal is not None else (self._num_rows - 1, self._num_cols - 1))
         
-        # Try each direction: up, right, down, left
+        # Reset visited flags before solving
+        self._reset_cells_visited()
         
-        # Up
-        if i > 0 and not self._cells[i][j].has_top_wall and not self._cells[i-1][j].visited:
-            # Draw a move to the cell above
-            self._cells[i][j].draw_move(self._cells[i-1][j])
-            
-            # If the path through the cell above leads to the end, we're done
-            if self._solve_r(i-1, j):
-                return True
-            
-            # Otherwise, undo the move (it's a dead end)
-            self._cells[i][j].draw_move(self._cells[i-1][j], True)
+        started = time.perf_counter()
+        if self._events is not None:
+            self._events(PhaseStarted("solve"))
+        self._animation.begin(self._num_rows * self._num_cols)
+        if algorithm == "dfs":
+            result = self._solve_r(*start, goal=goal)
+        else:
+            solver = self._implementation("SOLVERS", algorithm)
+            result = solver(self._grid, start, goal)
+            if self.stats is not None:
+                self.stats.cells_visited += result.expanded
+            self._draw_path(result.path)
+        if self._events is not None:
+            self._events(PathFound(result.path))
+        self._animation.finish(self._win)
+        self._end_phase("solve", started)
+        if result.cost is None and result.path:
+            result = result._replace(cost=self._path_cost(result.path))
+        return result
+    
+    def solve_many(self, pairs):
+        """
+        Solve many (start, goal) queries at once, returning a SolveResult
+        for each pair in order.
+        A perfect maze is a tree, so the exit's distance field doubles as a
+        rooted tree: each route climbs from both ends to their lowest common
+        ancestor, costing only the path length per query. Mazes with loops
+        fall back to a breadth-first search per query.
+        """
+        distance, parent = self._exit_distance_field()
+        if not self._exit_field[3]:
+            # With loops the cheapest route has to be searched for
+            algorithm = "dijkstra" if self._grid.weights is not None else "bfs"
+            solver = self._implementation("SOLVERS", algorithm)
+            return [solver(self._grid, self._check_cell(start), self._check_cell(goal))
+                    for start, goal in pairs]
         
-        # Right
-        if j < self._num_cols - 1 and not self._cells[i][j].has_right_wall and not self._cells[i][j+1].visited:
-            # Draw a move to the cell to the right
-            self._cells[i][j].draw_move(self._cells[i][j+1])
+        cols = self._num_cols
+        results = []
+        for start, goal in pairs:
+            a = self._grid.index(*self._check_cell(start))
+            b = self._grid.index(*self._check_cell(goal))
             
-            # If the path through the cell to the right leads to the end, we're done
-            if self._solve_r(i, j+1):
-                return True
+            # Climb the deeper end first, then both together until they meet
+            from_start = []
+            from_goal = []
+            while distance[a] > distance[b]:
+                from_start.append(a)
+                a = parent[a]
+            while distance[b] > distance[a]:
+                from_goal.append(b)
+                b = parent[b]
+            while a != b:
+                from_start.append(a)
+                a = parent[a]
+                from_goal.append(b)
+                b = parent[b]
             
-            # Otherwise, undo the move (it's a dead end)
-            self._cells[i][j].draw_move(self._cells[i][j+1], True)
+            from_start.append(a)
+            from_start.extend(reversed(from_goal))
+            path = [divmod(k, cols) for k in from_start]
+            results.append(SolveResult(path, len(from_start), self._path_cost(path)))
+        return results
+    
+    def solve_parallel(self, pairs, algorithm="bfs", workers=None):
+        """
+        Solve many (start, goal) queries with `algorithm` across `workers`
+        processes (default: all cores), returning a SolveResult for each
+        pair in order. The walls are shared with the workers through shared
+        memory instead of being pickled, so only queries and paths are sent.
+        """
+        if algorithm != "dfs" and algorithm not in SOLVERS:
+            raise ValueError(f"Unknown solver algorithm: {algorithm!r}")
+        queries = [(algorithm, self._check_cell(start), self._check_cell(goal)) for start, goal in pairs]
+        # multiprocessing is only loaded by mazes that solve in parallel
+        from sharedgrid import SharedGrid, solve_parallel
+        with SharedGrid(self._grid) as shared:
+            return solve_parallel(shared, queries, workers)
+    
+    def _path_cost(self, path):
+        # Total weight of the cells entered after the first, or the number of steps
+        weights = self._grid.weights
+        if weights is None:
+            return len(path) - 1
+        cols = self._num_cols
+        return sum(weights[i * cols + j] for i, j in path[1:])
+    
+    def _end_phase(self, name, started):
+        # Record how long a phase took, only if anyone is listening
+        if self.stats is None and "phase" not in self._hooks:
+            return
+        seconds = time.perf_counter() - started
+        if self.stats is not None:
+            phases = self.stats.phase_seconds
+            phases[name] = phases.get(name, 0.0) + seconds
+        if "phase" in self._hooks:
+            self._hooks["phase"](name, seconds)
+    
+    def _check_cell(self, cell):
+        i, j = cell
+        if not (0 <= i < self._num_rows and 0 <= j < self._num_cols):
+            raise ValueError(f"Cell {cell!r} is outside the maze")
+        return i, j
+    
+    def distance_from(self, i, j):
+        """
+        Number of steps from cell (i, j) to the exit along the shortest
+        route, or None if the exit can't be reached. O(1) once the distance
+        field has been built.
+        """
+        i, j = self._check_cell((i, j))
+        distance, _ = self._exit_distance_field()
+        steps = distance[self._grid.index(i, j)]
+        return steps if steps >= 0 else None
+    
+    def path_from(self, i, j):
+        """
+        Shortest path from cell (i, j) to the exit as (row, col) coordinates,
+        or an empty list if the exit can't be reached. O(path length) once
+        the distance field has been built.
+        """
+        i, j = self._check_cell((i, j))
+        distance, parent = self._exit_distance_field()
+        cols = self._num_cols
+        k = self._grid.index(i, j)
+        if distance[k] < 0:
+            return []
+        path = []
+        while k != -1:
+            path.append(divmod(k, cols))
+            k = parent[k]
+        return path
+    
+    def _exit_distance_field(self):
+        # One BFS from the exit answers every query until the walls change
+        version = self._grid.version
+        if self._exit_field is None or self._exit_field[0] != version:
+            distance, parent = distance_field(self._grid, (self._num_rows - 1, self._num_cols - 1))
+            # The maze is perfect (a tree) if every cell is reachable and
+            # there is exactly one passage fewer than there are cells
+            size = self._num_rows * self._num_cols
+            perfect = -1 not in distance and self._grid.count_passages() == size - 1
+            self._exit_field = (version, distance, parent, perfect)
+        return self._exit_field[1:3]
+    
+    def _solve_r(self, i, j, goal=None):
+        """
+        Iterative depth-first solver from cell (i, j) to `goal`, which
+        defaults to the exit (bottom-right).
+        Uses an explicit stack instead of recursion so that large mazes
+        don't hit Python's recursion limit. Directions are tried in the
+        same order as before (up, right, down, left), so a given maze
+        always produces the same path.
+        Returns a SolveResult with the path to the end cell, which is
+        empty if the end cell can't be reached.
+        """
+        cols = self._num_cols
+        walls = self._grid.walls
+        visited = self._grid.visited
+        end = self._grid.index(*goal) if goal is not None else len(walls) - 1
+        last_row_start = (self._num_rows - 1) * cols
+        draw = self._win is not None
+        stats = self.stats
+        on_visit = self._hooks.get("visit")
+        on_backtrack = self._hooks.get("backtrack")
+        emit = self._events
+        
+        # Enter the start cell
+        start = self._grid.index(i, j)
+        self._animate()
+        visited[start] = 1
+        expanded = 1
+        if on_visit is not None:
+            on_visit(i, j)
+        if emit is not None:
+            emit(Visit(i, j))
+        if start == end:
+            return self._solved(SolveResult([(i, j)], expanded), 1)
         
-        # Down
-        if i < self._num_rows - 1 and not self._cells[i][j].has_bottom_wall and not self._cells[i+1][j].visited:
-            # Draw a move to the cell below
-            self._cells[i][j].draw_move(self._cells[i+1][j])
+        # Next direction to try for each cell on the stack (0 up, 1 right, 2 down, 3 left)
+        tried = bytearray(len(walls))
+        stack = [start]
+        while stack:
+            k = stack[-1]
+            direction = tried[k]
+            cell_walls = walls[k]
             
-            # If the path through the cell below leads to the end, we're done
-            if self._solve_r(i+1, j):
-                return True
+            # Find the next open, unvisited neighbour in order up, right, down, left
+            next_k = -1
+            if direction == 0:
+                direction = 1
+                if k >= cols and not cell_walls & TOP and not visited[k - cols]:
+                    next_k = k - cols
+            if next_k < 0 and direction == 1:
+                direction = 2
+                if not cell_walls & RIGHT and (k + 1) % cols and not visited[k + 1]:
+                    next_k = k + 1
+            if next_k < 0 and direction == 2:
+                direction = 3
+                if k < last_row_start and not cell_walls & BOTTOM and not visited[k + cols]:
+                    next_k = k + cols
+            if next_k < 0 and direction == 3:
+                direction = 4
+                if not cell_walls & LEFT and k % cols and not visited[k - 1]:
+                    next_k = k - 1
+            tried[k] = direction
             
-            # Otherwise, undo the move (it's a dead end)
-            self._cells[i][j].draw_move(self._cells[i+1][j], True)
-        
-        # Left
-        if j > 0 and not self._cells[i][j].has_left_wall and not self._cells[i][j-1].visited:
-            # Draw a move to the cell to the left
-            self._cells[i][j].draw_move(self._cells[i][j-1])
+            # Dead end: backtrack and undo the move that led here
+            if next_k < 0:
+                stack.pop()
+                if stats is not None:
+                    stats.backtracks += 1
+                if on_backtrack is not None:
+                    on_backtrack(k // cols, k % cols)
+                if emit is not None:
+                    emit(Backtrack(k // cols, k % cols))
+                if draw and stack:
+                    self._draw_move(stack[-1], k, True)
+                continue
             
-            # If the path through the cell to the left leads to the end, we're done
-            if self._solve_r(i, j-1):
-                return True
+            # Move into the chosen neighbour
+            if draw:
+                self._draw_move(k, next_k)
+                self._animate()
+            visited[next_k] = 1
+            expanded += 1
+            stack.append(next_k)
+            if stats is not None and len(stack) > stats.max_stack_depth:
+                stats.max_stack_depth = len(stack)
+            if on_visit is not None:
+                on_visit(next_k // cols, next_k % cols)
+            if emit is not None:
+                emit(Visit(next_k // cols, next_k % cols))
             
-            # Otherwise, undo the move (it's a dead end)
-            self._cells[i][j].draw_move(self._cells[i][j-1], True)
+            # If we reached the end cell, we solved the maze
+            if next_k == end:
+                return self._solved(SolveResult([divmod(cell, cols) for cell in stack], expanded))
         
-        # If none of the directions worked out, this cell is a dead end
-        return False
+        # Every reachable cell was a dead end
+        return self._solved(SolveResult([], expanded))
+    
+    def _solved(self, result, depth=0):
+        # Add a finished depth-first search to the stats
+        if self.stats is not None:
+            self.stats.cells_visited += result.expanded
+            self.stats.max_stack_depth = max(self.stats.max_stack_depth, depth)
+        return result
     
     def _create_cells(self):
-        # Initialize the cells as a 2D grid (list of lists)
-        self._cells = [[Cell(self._win) for _ in range(self._num_cols)] for _ in range(self._num_rows)]
+        # Initialize the packed wall grid and the Cell views over it
+        self._grid = Grid(self._num_rows, self._num_cols)
+        self._cells = CellGrid(self._grid, self._win)
+        if self._win is None:
+            return
         
         # Draw each cell
         for i in range(self._num_rows):
@@ -121,97 +470,250 @@ class Maze:
     
     def _break_entrance_and_exit(self):
         # Break the top wall of the entrance cell (top-left)
-        self._cells[0][0].has_top_wall = False
+        self._grid.set_wall(0, 0, TOP, False)
         self._draw_cell(0, 0)
         
         # Break the bottom wall of the exit cell (bottom-right)
-        self._cells[self._num_rows-1][self._num_cols-1].has_bottom_wall = False
+        self._grid.set_wall(self._num_rows-1, self._num_cols-1, BOTTOM, False)
         self._draw_cell(self._num_rows-1, self._num_cols-1)
+        
+        if self._events is not None:
+            self._events(WallRemoved(0, 0, TOP))
+            self._events(WallRemoved(self._num_rows-1, self._num_cols-1, BOTTOM))
     
     def _break_walls(self):
-        # Start the recursive wall-breaking process from the entrance cell
-        self._break_walls_r(0, 0)
+        # Start the animated backtracker from the entrance cell
+        if self._generator == "backtracker":
+            self._break_walls_r(0, 0)
+            return
+        
+        # The other generators carve the whole grid, then every cell is redrawn
+        generator = self._implementation("GENERATORS", self._generator)
+        generator(self._grid, self._rng)
+        if self.stats is not None:
+            # These generators aren't instrumented step by step, but every
+            # one of them visits each cell and opens a spanning tree
+            self.stats.cells_visited += self._num_rows * self._num_cols
+            self.stats.wall_breaks += self._grid.count_passages()
+        if self._events is not None or self._hooks:
+            self._report_passages()
+        if self._win is not None:
+            for i in range(self._num_rows):
+                for j in range(self._num_cols):
+                    self._draw_cell(i, j)
+    
+    def _report_passages(self):
+        # Report every cell and passage a whole-grid generator made, row by
+        # row, to the event sink and the visit and wall_break hooks
+        cols = self._num_cols
+        last_row_start = (self._num_rows - 1) * cols
+        walls = self._grid.walls
+        emit = self._events
+        on_visit = self._hooks.get("visit")
+        on_wall_break = self._hooks.get("wall_break")
+        for k in range(len(walls)):
+            i, j = divmod(k, cols)
+            if on_visit is not None:
+                on_visit(i, j)
+            for wall, is_inside in ((RIGHT, j < cols - 1), (BOTTOM, k < last_row_start)):
+                if is_inside and not walls[k] & wall:
+                    if emit is not None:
+                        emit(WallRemoved(i, j, wall))
+                    if on_wall_break is not None:
+                        on_wall_break(i, j, wall)
+    
+    def _braid(self, fraction):
+        # Open extra walls in dead ends so the maze has loops
+        opened = braid_walls(self._grid, self._rng, fraction)
+        if self.stats is not None:
+            self.stats.wall_breaks += len(opened)
+        on_wall_break = self._hooks.get("wall_break")
+        for i, j, wall in opened:
+            if self._events is not None:
+                self._events(WallRemoved(i, j, wall))
+            if on_wall_break is not None:
+                on_wall_break(i, j, wall)
+            self._draw_cell(i, j)
+    
+    def _implementation(self, registry, name):
+        # The NumPy backend uses its own version of an algorithm where there
+        # is one and NumPy is installed, and the pure-Python one otherwise.
+        # `registry` is "GENERATORS" or "SOLVERS".
+        if self._backend == "numpy":
+            # Imported here so only mazes asking for NumPy pay for loading it
+            import numpy_backend
+            numpy_versions = getattr(numpy_backend, registry)
+            if name in numpy_versions:
+                return numpy_versions[name]
+        return (GENERATORS if registry == "GENERATORS" else SOLVERS)[name]
     
     def _reset_cells_visited(self):
         # Reset the visited property of all cells to False
-        for i in range(self._num_rows):
-            for j in range(self._num_cols):
-                self._cells[i][j].visited = False
+        self._grid.reset_visited()
     
     def _break_walls_r(self, i, j):
-        # Mark the current cell as visited
-        self._cells[i][j].visited = True
+        """
+        Iterative recursive-backtracker starting at cell (i, j).
+        Uses an explicit stack instead of recursion so that large mazes
+        don't hit Python's recursion limit. Random choices are made in the
+        same order as the recursive version, so seeded mazes are unchanged.
+        """
+        rows = self._num_rows
+        cols = self._num_cols
+        walls = self._grid.walls
+        visited = self._grid.visited
+        draw = self._win is not None
+        stats = self.stats
+        on_visit = self._hooks.get("visit")
+        on_backtrack = self._hooks.get("backtrack")
+        on_wall_break = self._hooks.get("wall_break")
+        emit = self._events
         
-        # Loop until we can't go any further
-        while True:
+        # Mark the starting cell as visited
+        visited[i * cols + j] = 1
+        stack = [i * cols + j]
+        if stats is not None:
+            stats.cells_visited += 1
+            stats.max_stack_depth = max(stats.max_stack_depth, 1)
+        if on_visit is not None:
+            on_visit(i, j)
+        if emit is not None:
+            emit(Visit(i, j))
+        last_row_start = (rows - 1) * cols
+        randrange = self._rng.randrange
+        
+        # Loop until every reachable cell has been visited
+        while stack:
+            k = stack[-1]
+            j = k % cols
+            
             # Create a list to hold possible directions
             possible_directions = []
             
             # Check adjacent cells (up, right, down, left)
             # Up
-            if i > 0 and not self._cells[i-1][j].visited:
-                possible_directions.append((i-1, j, "up"))
+            if k >= cols and not visited[k - cols]:
+                possible_directions.append(TOP)
             # Right
-            if j < self._num_cols-1 and not self._cells[i][j+1].visited:
-                possible_directions.append((i, j+1, "right"))
+            if j < cols-1 and not visited[k + 1]:
+                possible_directions.append(RIGHT)
             # Down
-            if i < self._num_rows-1 and not self._cells[i+1][j].visited:
-                possible_directions.append((i+1, j, "down"))
+            if k < last_row_start and not visited[k + cols]:
+                possible_directions.append(BOTTOM)
             # Left
-            if j > 0 and not self._cells[i][j-1].visited:
-                possible_directions.append((i, j-1, "left"))
+            if j > 0 and not visited[k - 1]:
+                possible_directions.append(LEFT)
             
-            # If there are no possible directions, break out of the loop
-            if len(possible_directions) == 0:
-                self._draw_cell(i, j)
-                return
+            # If there are no possible directions, backtrack
+            if not possible_directions:
+                if draw:
+                    self._draw_cell(k // cols, j)
+                stack.pop()
+                if stats is not None:
+                    stats.backtracks += 1
+                if on_backtrack is not None:
+                    on_backtrack(k // cols, j)
+                if emit is not None:
+                    emit(Backtrack(k // cols, j))
+                continue
             
             # Choose a random direction
-            direction_index = random.randrange(len(possible_directions))
-            next_i, next_j, direction = possible_directions[direction_index]
+            direction = possible_directions[randrange(len(possible_directions))]
             
             # Break down the walls between the current cell and the chosen cell
-            if direction == "up":
-                self._cells[i][j].has_top_wall = False
-                self._cells[next_i][next_j].has_bottom_wall = False
-            elif direction == "right":
-                self._cells[i][j].has_right_wall = False
-                self._cells[next_i][next_j].has_left_wall = False
-            elif direction == "down":
-                self._cells[i][j].has_bottom_wall = False
-                self._cells[next_i][next_j].has_top_wall = False
-            elif direction == "left":
-                self._cells[i][j].has_left_wall = False
-                self._cells[next_i][next_j].has_right_wall = False
+            if direction == TOP:
+                next_k = k - cols
+                walls[k] &= ~TOP
+                walls[next_k] &= ~BOTTOM
+            elif direction == RIGHT:
+                next_k = k + 1
+                walls[k] &= ~RIGHT
+                walls[next_k] &= ~LEFT
+            elif direction == BOTTOM:
+                next_k = k + cols
+                walls[k] &= ~BOTTOM
+                walls[next_k] &= ~TOP
+            else:
+                next_k = k - 1
+                walls[k] &= ~LEFT
+                walls[next_k] &= ~RIGHT
             
             # Redraw the current cell to show the wall removal
-            self._draw_cell(i, j)
+            if draw:
+                self._draw_cell(k // cols, j)
+            
+            # Continue from the chosen cell
+            visited[next_k] = 1
+            stack.append(next_k)
             
-            # Recursively visit the chosen cell
-            self._break_walls_r(next_i, next_j)
+            if stats is not None:
+                stats.wall_breaks += 1
+                stats.cells_visited += 1
+                if len(stack) > stats.max_stack_depth:
+                    stats.max_stack_depth = len(stack)
+            if on_wall_break is not None:
+                on_wall_break(k // cols, j, direction)
+            if on_visit is not None:
+                on_visit(next_k // cols, next_k % cols)
+            if emit is not None:
+                emit(WallRemoved(k // cols, j, direction))
+                emit(Visit(next_k // cols, next_k % cols))
     
     def _draw_cell(self, i, j):
         # Check if win exists
         if self._win is None:
             return 
 
+        # Draw the cell
+        self._cells[i][j].draw(*self._cell_bounds(i, j))
+        if self.stats is not None:
+            self.stats.draw_calls += 4
+        
+        # Animate the drawing
+        self._animate()
+    
+    def _cell_bounds(self, i, j):
         # Calculate the position of the cell based on its indices, cell size and maze position
         x1 = self._x1 + j * self._cell_size_x
         y1 = self._y1 + i * self._cell_size_y
-        x2 = x1 + self._cell_size_x
-        y2 = y1 + self._cell_size_y
+        return x1, y1, x1 + self._cell_size_x, y1 + self._cell_size_y
+    
+    def _draw_move(self, k, next_k, undo=False):
+        # Check if win exists
+        if self._win is None:
+            return
         
-        # Draw the cell
-        self._cells[i][j].draw(x1, y1, x2, y2)
+        cols = self._num_cols
+        cell = self._cells[k // cols][k % cols]
+        to_cell = self._cells[next_k // cols][next_k % cols]
         
-        # Animate the drawing
-        self._animate()
+        # Cells drawn in one batch by render() haven't been placed yet
+        for c, index in ((cell, k), (to_cell, next_k)):
+            if c._x1 is None:
+                c.place(*self._cell_bounds(index // cols, index % cols))
+        cell.draw_move(to_cell, undo)
+        if self.stats is not None:
+            self.stats.draw_calls += 1
+    
+    def _draw_path(self, path):
+        # Draw a path found by one of the non-animated solvers
+        if self._win is None:
+            return
+        
+        cols = self._num_cols
+        for (i, j), (next_i, next_j) in zip(path, path[1:]):
+            self._draw_move(i * cols + j, next_i * cols + next_j)
+            self._animate()
     
     def _animate(self):
         # Check if win exists
         if self._win is None:
             return 
 
-        # Redraw the window and pause briefly to visualize the maze creation
-        self._win.redraw()
-        time.sleep(0.05) 
\ No newline at end of file
+        # Let the animation settings decide when to redraw and how long to pause
+        if self.stats is None:
+            self._animation.step(self._win)
+            return
+        started = time.perf_counter()
+        self._animation.step(self._win)
+        self.stats.animate_seconds += time.perf_counter() - started
\ No newline at end of file
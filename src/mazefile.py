@@ -0,0 +1,103 @@
+"""
+Compact binary file format for mazes.
+
+Layout (little-endian):
+    magic      4 bytes  b"MAZE"
+    version    u16      2 if weights are stored, else 1
+    flags      u16      bit 0 set if a seed is stored, bit 1 if weights are
+    num_rows   u32
+    num_cols   u32
+    seed       i64      0 when no seed is stored
+    name_len   u8       length of the generator name
+    generator  name_len bytes of ASCII
+    walls      ceil(num_rows * num_cols / 2) bytes, two cells per byte,
+               low nibble first, using the wall bits from grid.py
+    weights    num_rows * num_cols u32 cell weights, only with flag bit 1
+
+Files without weights keep version 1, so older readers still open them.
+"""
+
+import mmap
+import struct
+import sys
+from array import array
+
+from grid import Grid, PackedWalls, pack_walls
+
+MAGIC = b"MAZE"
+VERSION = 2
+HAS_SEED = 1
+HAS_WEIGHTS = 2
+
+_HEADER = struct.Struct("<4sHHIIqB")
+
+
+class MazeFileError(ValueError):
+    pass
+
+
+def dump_grid(grid, seed=None, generator=""):
+    """Return a grid and the settings it was generated with in the file format, as bytes."""
+    flags = 0
+    stored_seed = 0
+    # Only integer seeds fit the header; anything else is left out
+    if isinstance(seed, int) and -2**63 <= seed < 2**63:
+        flags |= HAS_SEED
+        stored_seed = seed
+
+    version = 1
+    weights = b""
+    if grid.weights is not None:
+        if max(grid.weights) > 0xFFFFFFFF:
+            raise MazeFileError("Cell weights must fit in 32 bits to be saved")
+        flags |= HAS_WEIGHTS
+        version = VERSION
+        weights = array("I", grid.weights)
+        if sys.byteorder == "big":
+            weights.byteswap()
+        weights = weights.tobytes()
+
+    name = generator.encode("ascii")
+    header = _HEADER.pack(MAGIC, version, flags, grid.num_rows, grid.num_cols, stored_seed, len(name))
+    return header + name + pack_walls(grid.walls) + weights
+
+
+def save_grid(path, grid, seed=None, generator=""):
+    """Write a grid and the settings it was generated with to `path`."""
+    with open(path, "wb") as f:
+        f.write(dump_grid(grid, seed, generator))
+
+
+def load_grid(path):
+    """
+    Memory-map the maze file at `path`.
+    Returns (grid, seed, generator). The grid's walls are read from the
+    mapping on demand; changes to them stay private to this process.
+    """
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    if len(mapped) < _HEADER.size:
+        raise MazeFileError(f"{path} is too short to be a maze file")
+    magic, version, flags, num_rows, num_cols, seed, name_len = _HEADER.unpack_from(mapped)
+    if magic != MAGIC:
+        raise MazeFileError(f"{path} is not a maze file")
+    if not 1 <= version <= VERSION:
+        raise MazeFileError(f"Unsupported maze file version {version}")
+
+    offset = _HEADER.size + name_len
+    size = num_rows * num_cols
+    weights_offset = offset + (size + 1) // 2
+    end = weights_offset + (4 * size if flags & HAS_WEIGHTS else 0)
+    if len(mapped) < end:
+        raise MazeFileError(f"{path} is truncated")
+
+    generator = mapped[_HEADER.size:offset].decode("ascii")
+    grid = Grid(num_rows, num_cols, PackedWalls(mapped, offset, size))
+    if flags & HAS_WEIGHTS:
+        # Weights are looked up at random by the solvers, so they are read in
+        weights = array("I", mapped[weights_offset:end])
+        if sys.byteorder == "big":
+            weights.byteswap()
+        grid.weights = array("l", weights)
+    return grid, (seed if flags & HAS_SEED else None), generator
@@ -0,0 +1,201 @@
+"""
+Optional NumPy implementations of the whole-grid generators and solvers.
+
+They work on the grid's wall bytes as a uint8 array without copying them.
+NumPy is not required: when it isn't installed HAVE_NUMPY is False, the
+registries below are empty and Maze falls back to the pure-Python code.
+
+The NumPy versions draw their random numbers differently, so a seed gives a
+different maze than the pure-Python generator of the same name.
+
+The BFS expands a whole frontier of cells per array operation when the
+frontier is wide, as in binary tree, sidewinder or braided mazes. Perfect
+mazes from the backtracker have long corridors whose frontier is only a few
+cells wide; those levels are expanded one cell at a time in Python, where
+the fixed cost of the array operations would outweigh the work.
+"""
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from array import array
+
+from grid import TOP, RIGHT, BOTTOM, LEFT, unpack_walls
+from generators import join_edges
+from solvers import SolveResult, _neighbour_function
+
+HAVE_NUMPY = np is not None
+
+# Frontiers narrower than this are expanded in Python by bfs()
+NARROW_FRONTIER = 64
+
+
+def _wall_array(grid):
+    # A uint8 view of the walls; loaded (packed) walls are unpacked first
+    walls = grid.walls
+    if not isinstance(walls, (bytearray, memoryview)):
+        walls = unpack_walls(walls.packed(), len(walls))
+    return np.frombuffer(walls, dtype=np.uint8)
+
+
+def _numpy_rng(rng):
+    # Derive a NumPy generator from the maze's own random source
+    return np.random.default_rng(rng.getrandbits(64))
+
+
+def binary_tree(grid, rng):
+    """Binary tree: every cell opens either up or left, all cells at once."""
+    rows = grid.num_rows
+    cols = grid.num_cols
+    walls = np.frombuffer(grid.walls, dtype=np.uint8).reshape(rows, cols)
+
+    up = _numpy_rng(rng).random((rows, cols)) < 0.5
+    # The top row can only go left, the left column only up
+    up[0, :] = False
+    up[:, 0] = True
+    up[0, 0] = False
+    left = ~up
+    left[0, 0] = False
+
+    walls[up] &= ~TOP & 0xFF
+    walls[:-1][up[1:]] &= ~BOTTOM & 0xFF
+    walls[left] &= ~LEFT & 0xFF
+    walls[:, :-1][left[:, 1:]] &= ~RIGHT & 0xFF
+
+
+def sidewinder(grid, rng):
+    """Sidewinder with every row's runs decided in one pass."""
+    rows = grid.num_rows
+    cols = grid.num_cols
+    walls = np.frombuffer(grid.walls, dtype=np.uint8)
+    np_rng = _numpy_rng(rng)
+
+    # The top row is a single corridor
+    walls[:cols - 1] &= ~RIGHT & 0xFF
+    walls[1:cols] &= ~LEFT & 0xFF
+    if rows == 1:
+        return
+
+    # Which cells close their run; runs always close at the end of a row,
+    # so laying the rows end to end never joins runs across rows
+    close = np_rng.random((rows - 1, cols)) < 0.5
+    close[:, -1] = True
+    close = close.ravel()
+    first = cols
+
+    # Cells that don't close a run open to the right
+    joined = np.flatnonzero(~close) + first
+    walls[joined] &= ~RIGHT & 0xFF
+    walls[joined + 1] &= ~LEFT & 0xFF
+
+    # Each run opens upwards from one random cell
+    ends = np.flatnonzero(close)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    chosen = starts + (np_rng.random(len(ends)) * (ends - starts + 1)).astype(np.int64) + first
+    walls[chosen] &= ~TOP & 0xFF
+    walls[chosen - cols] &= ~BOTTOM & 0xFF
+
+
+def kruskal(grid, rng):
+    """Randomised Kruskal with the edge list built and shuffled by NumPy."""
+    rows = grid.num_rows
+    cols = grid.num_cols
+    cells = np.arange(rows * cols, dtype=np.int64)
+
+    # Edge e joins cell e // 2 to its right (e even) or lower (e odd) neighbour
+    right = 2 * cells[(cells + 1) % cols != 0]
+    down = 2 * cells[:(rows - 1) * cols] + 1
+    edges = np.concatenate((right, down))
+    _numpy_rng(rng).shuffle(edges)
+    join_edges(grid, edges.tolist())
+
+
+def bfs(grid, start, goal):
+    """
+    Breadth-first search one whole frontier at a time, with array
+    operations for frontiers of at least NARROW_FRONTIER cells and a plain
+    loop for narrower ones. Always finds a shortest path; `expanded` counts
+    the cells of every frontier expanded before the goal was reached.
+    """
+    cols = grid.num_cols
+    size = grid.num_rows * cols
+    walls = _wall_array(grid)
+    start = grid.index(*start)
+    goal = grid.index(*goal)
+    neighbours = _neighbour_function(grid)
+
+    # Which moves are open from each cell, including the grid's edges
+    open_up = (walls & TOP) == 0
+    open_up[:cols] = False
+    open_right = (walls & RIGHT) == 0
+    open_right[cols - 1::cols] = False
+    open_down = (walls & BOTTOM) == 0
+    open_down[size - cols:] = False
+    open_left = (walls & LEFT) == 0
+    open_left[::cols] = False
+    moves = ((open_up, -cols), (open_right, 1), (open_down, cols), (open_left, -1))
+
+    # Python buffers with NumPy views of the same memory, so either kind of
+    # level can update them
+    parent = array("q", [-1]) * size
+    seen = bytearray(size)
+    parent_view = np.frombuffer(parent, dtype=np.int64)
+    seen_view = np.frombuffer(seen, dtype=bool)
+    seen[start] = 1
+    frontier = [start]
+    expanded = 0
+    while len(frontier) and not seen[goal]:
+        expanded += len(frontier)
+        if len(frontier) < NARROW_FRONTIER:
+            if not isinstance(frontier, list):
+                frontier = frontier.tolist()
+            reached = []
+            for k in frontier:
+                for next_k in neighbours(k):
+                    if not seen[next_k]:
+                        seen[next_k] = 1
+                        parent[next_k] = k
+                        reached.append(next_k)
+            frontier = reached
+            continue
+
+        frontier = np.asarray(frontier, dtype=np.int64)
+        reached = []
+        for is_open, delta in moves:
+            cells = frontier[is_open[frontier]]
+            next_cells = cells + delta
+            new = ~seen_view[next_cells]
+            next_cells = next_cells[new]
+            # Marking after each direction stops two frontier cells both
+            # claiming the same neighbour
+            seen_view[next_cells] = True
+            parent_view[next_cells] = cells[new]
+            reached.append(next_cells)
+        frontier = np.concatenate(reached)
+
+    if not seen[goal]:
+        return SolveResult([], expanded)
+
+    path = []
+    k = goal
+    while k != -1:
+        path.append(divmod(k, cols))
+        k = parent[k]
+    path.reverse()
+    return SolveResult(path, expanded + 1)
+
+
+# NumPy implementations by name, used by Maze(..., backend="numpy")
+GENERATORS = {}
+SOLVERS = {}
+if HAVE_NUMPY:
+    GENERATORS = {
+        "binary_tree": binary_tree,
+        "sidewinder": sidewinder,
+        "kruskal": kruskal,
+    }
+    SOLVERS = {
+        "bfs": bfs,
+    }
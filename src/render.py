@@ -0,0 +1,156 @@
+"""
+Fast, batched maze rendering.
+
+wall_segments() turns a grid into the fewest straight lines that draw all of
+its standing walls, merging collinear walls into long runs. save_png() and
+save_ppm() rasterise a grid straight to an image file without Tk, and
+tile_ppm() rasterises part of one for tiled, zoomable views.
+"""
+
+import struct
+import zlib
+
+from grid import TOP, RIGHT, BOTTOM, LEFT
+
+
+def _runs(present):
+    # Yield (start, end) for each run of consecutive True values
+    start = None
+    for index, value in enumerate(present):
+        if value and start is None:
+            start = index
+        elif not value and start is not None:
+            yield start, index
+            start = None
+    if start is not None:
+        yield start, len(present)
+
+
+def wall_segments(grid, x1, y1, cell_size_x, cell_size_y):
+    """
+    Return the standing walls of a grid as (x1, y1, x2, y2) line segments,
+    with walls along the same grid line merged into single runs.
+    """
+    rows = grid.num_rows
+    cols = grid.num_cols
+    walls = grid.walls
+    segments = []
+
+    # Horizontal grid lines: above each row, plus the bottom edge
+    for r in range(rows + 1):
+        above = walls[(r - 1) * cols:r * cols] if r > 0 else bytes(cols)
+        below = walls[r * cols:(r + 1) * cols] if r < rows else bytes(cols)
+        present = [bool(a & BOTTOM or b & TOP) for a, b in zip(above, below)]
+        y = y1 + r * cell_size_y
+        for start, end in _runs(present):
+            segments.append((x1 + start * cell_size_x, y, x1 + end * cell_size_x, y))
+
+    # Vertical grid lines: left of each column, plus the right edge
+    for c in range(cols + 1):
+        present = []
+        for i in range(rows):
+            k = i * cols + c
+            present.append(bool(
+                (c > 0 and walls[k - 1] & RIGHT) or (c < cols and walls[k] & LEFT)
+            ))
+        x = x1 + c * cell_size_x
+        for start, end in _runs(present):
+            segments.append((x, y1 + start * cell_size_y, x, y1 + end * cell_size_y))
+
+    return segments
+
+
+def _pixel_rows(grid, cell_px, channels, rows=None, cols=None):
+    """
+    Yield the image one pixel row at a time as bytes, `channels` bytes per
+    pixel: black walls one pixel wide on white, cell_px pixels per cell.
+    `rows` and `cols` are ranges picking part of the grid (default: all of
+    it); a range with a step draws every step-th cell, for zoomed-out views.
+    """
+    num_cols = grid.num_cols
+    rows = rows if rows is not None else range(grid.num_rows)
+    cols = cols if cols is not None else range(num_cols)
+    walls = grid.walls
+    black = b"\x00" * channels
+    white = b"\xff" * channels
+
+    # Pixels for one cell's width along a horizontal grid line, indexed by
+    # whether the wall is there; each starts with its left corner post
+    line_chunks = [black + white * (cell_px - 1), black * cell_px]
+    # Pixels for one cell's width inside a row, indexed by its left wall
+    inside_chunks = [white * cell_px, black + white * (cell_px - 1)]
+
+    previous = bytes(len(cols))
+    for i in rows:
+        base = i * num_cols
+        # Packed walls only slice contiguously, so take every step-th cell after
+        row = bytes(walls[base + cols.start:base + cols.stop])[::cols.step]
+
+        # The grid line above this row
+        yield b"".join([line_chunks[bool(a & BOTTOM or b & TOP)] for a, b in zip(previous, row)]) + black
+
+        # The inside of the row, repeated for every pixel row of the cells
+        left_of = b"\x00" + row[:-1]
+        inside = b"".join([inside_chunks[bool(a & RIGHT or b & LEFT)] for a, b in zip(left_of, row)])
+        inside += black if row[-1] & RIGHT else white
+        for _ in range(cell_px - 1):
+            yield inside
+        previous = row
+
+    # The bottom edge
+    yield b"".join([line_chunks[bool(a & BOTTOM)] for a in previous]) + black
+
+
+def image_size(grid, cell_px):
+    return grid.num_cols * cell_px + 1, grid.num_rows * cell_px + 1
+
+
+def save_ppm(path, grid, cell_px=10):
+    """Write the maze as a binary PPM image."""
+    width, height = image_size(grid, cell_px)
+    with open(path, "wb") as f:
+        f.write(b"P6\n%d %d\n255\n" % (width, height))
+        for pixels in _pixel_rows(grid, cell_px, 3):
+            f.write(pixels)
+
+
+def tile_ppm(grid, rows, cols, cell_px=10):
+    """
+    Rasterise the cells in the ranges `rows` x `cols` as greyscale PPM
+    (PGM) data, which Tk's PhotoImage reads directly.
+    """
+    width = len(cols) * cell_px + 1
+    height = len(rows) * cell_px + 1
+    return b"P5\n%d %d\n255\n" % (width, height) + b"".join(_pixel_rows(grid, cell_px, 1, rows, cols))
+
+
+def _png_chunk(kind, data):
+    chunk = kind + data
+    return struct.pack(">I", len(data)) + chunk + struct.pack(">I", zlib.crc32(chunk))
+
+
+def save_png(path, grid, cell_px=10):
+    """Write the maze as a greyscale PNG image."""
+    width, height = image_size(grid, cell_px)
+    compressor = zlib.compressobj(1)
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        # 8-bit greyscale, no interlacing
+        f.write(_png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)))
+
+        # Compress row by row so the raw pixels never all sit in memory
+        data = []
+        for pixels in _pixel_rows(grid, cell_px, 1):
+            # Each row starts with filter type 0 (none)
+            data.append(compressor.compress(b"\x00" + pixels))
+        data.append(compressor.flush())
+        f.write(_png_chunk(b"IDAT", b"".join(data)))
+        f.write(_png_chunk(b"IEND", b""))
+
+
+def save_image(path, grid, cell_px=10):
+    """Write the maze as a PNG or PPM image, chosen by the file extension."""
+    if str(path).lower().endswith(".ppm"):
+        save_ppm(path, grid, cell_px)
+    else:
+        save_png(path, grid, cell_px)
@@ -0,0 +1,371 @@
+"""
+An asyncio HTTP and WebSocket service for generating and solving mazes.
+
+    python3 src/server.py --port 8080 --workers 4
+
+Endpoints, all GET, taking rows, cols, seed, generator and algo as query
+parameters:
+
+    /maze     the maze in the binary format from mazefile.py
+    /solve    JSON: {"rows", "cols", "seed", "generator", "algorithm",
+              "expanded", "cost", "path": [[row, col], ...]}
+    /events   a WebSocket sending every step of generating and solving as
+              JSON text messages, each a list of events such as
+              ["wall", i, j, wall], ["visit", i, j], ["backtrack", i, j],
+              ["phase", name] and ["path", [[row, col], ...]],
+              ending with {"done": true}
+
+Mazes are built and solved headless in a pool of worker processes, so the
+event loop only does I/O. /solve responses are encoded in the workers too,
+and /events messages are encoded in a thread a message at a time, so a big
+maze never holds up other clients. Large responses are sent in chunks as
+they are written. Results are kept in an LRU cache keyed by the maze
+settings and bounded both in entries and in bytes, so repeated requests for
+the same seed skip the work, and concurrent requests for the same maze share
+one computation.
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+import struct
+import sys
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+
+from maze import Maze
+from generators import GENERATORS
+from solvers import SOLVERS
+from mazefile import dump_grid
+from tracefile import Trace
+from events import PhaseStarted, WallRemoved, Visit, Backtrack
+
+# Largest maze served, in cells
+MAX_CELLS = 4_000_000
+# Path cells per chunk of a /solve response, and events per WebSocket message
+CHUNK_CELLS = 10_000
+EVENTS_PER_MESSAGE = 1_000
+
+_WEBSOCKET_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            500: "Internal Server Error"}
+
+
+class RequestError(ValueError):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class LRUCache:
+    """
+    A dict holding at most `max_entries` items taking at most `max_bytes`
+    between them, dropping the least recently used. Sizes are given by the
+    caller; an item bigger than `max_bytes` on its own is not kept at all.
+    """
+    def __init__(self, max_entries, max_bytes=256 << 20):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        # key -> (value, size)
+        self._items = OrderedDict()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key):
+        entry = self._items.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._items.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, value, size=0):
+        self.discard(key)
+        if size > self.max_bytes:
+            return
+        self._items[key] = (value, size)
+        self.bytes += size
+        self._evict()
+
+    def resize(self, key, size):
+        """Record that the item under `key` now takes `size` bytes."""
+        entry = self._items.get(key)
+        if entry is None:
+            return
+        if size > self.max_bytes:
+            self.discard(key)
+            return
+        self._items[key] = (entry[0], size)
+        self.bytes += size - entry[1]
+        self._evict()
+
+    def discard(self, key):
+        entry = self._items.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[1]
+
+    def _evict(self):
+        while len(self._items) > self.max_entries or self.bytes > self.max_bytes:
+            _, (_, size) = self._items.popitem(last=False)
+            self.bytes -= size
+
+
+# Work done in the worker processes; each returns something small to pickle
+
+def build_maze(num_rows, num_cols, seed, generator):
+    maze = Maze(0, 0, num_rows, num_cols, 1, 1, seed=seed, generator=generator)
+    return dump_grid(maze._grid, seed, generator)
+
+
+def solve_maze(num_rows, num_cols, seed, generator, algorithm, chunk_cells):
+    # The JSON response, already split into chunks of `chunk_cells` path cells
+    maze = Maze(0, 0, num_rows, num_cols, 1, 1, seed=seed, generator=generator)
+    result = maze.solve(algorithm)
+    path = result.path
+    head = json.dumps({"rows": num_rows, "cols": num_cols, "seed": seed, "generator": generator,
+                       "algorithm": algorithm, "expanded": result.expanded, "cost": result.cost})
+    chunks = [(head[:-1] + ', "path": [').encode()]
+    for start in range(0, len(path), chunk_cells):
+        cells = ",".join(f"[{i},{j}]" for i, j in path[start:start + chunk_cells])
+        chunks.append((("," if start else "") + cells).encode())
+    chunks.append(b"]}\n")
+    return chunks
+
+
+def record_maze(num_rows, num_cols, seed, generator, algorithm):
+    # A trace pickles as about one byte per event
+    trace = Trace(num_rows, num_cols, keyframe_every=1 << 30)
+    maze = Maze(0, 0, num_rows, num_cols, 1, 1, seed=seed, generator=generator, events=trace)
+    maze.solve(algorithm)
+    return trace
+
+
+def _event_messages(trace):
+    # The JSON text of each WebSocket message, EVENTS_PER_MESSAGE events at a time
+    batch = []
+    for event in trace.events():
+        batch.append(_event_json(event))
+        if len(batch) == EVENTS_PER_MESSAGE:
+            yield json.dumps(batch).encode()
+            batch = []
+    if batch:
+        yield json.dumps(batch).encode()
+
+
+def _event_json(event):
+    if isinstance(event, WallRemoved):
+        return ["wall", *event]
+    if isinstance(event, Visit):
+        return ["visit", *event]
+    if isinstance(event, Backtrack):
+        return ["backtrack", *event]
+    if isinstance(event, PhaseStarted):
+        return ["phase", event.name]
+    return ["path", event.path]
+
+
+def parse_query(query):
+    """Validate the maze settings of a request's query string."""
+    params = {name: values[-1] for name, values in parse_qs(query).items()}
+    try:
+        num_rows = int(params.get("rows", 10))
+        num_cols = int(params.get("cols", 10))
+        seed = int(params["seed"]) if "seed" in params else random.randrange(2**63)
+    except ValueError:
+        raise RequestError(400, "rows, cols and seed must be integers")
+    if num_rows < 1 or num_cols < 1 or num_rows * num_cols > MAX_CELLS:
+        raise RequestError(400, f"rows and cols must be positive, with at most {MAX_CELLS} cells")
+
+    generator = params.get("generator", "backtracker")
+    if generator != "backtracker" and generator not in GENERATORS:
+        raise RequestError(400, f"Unknown maze generator: {generator!r}")
+    algorithm = params.get("algo", "dfs")
+    if algorithm != "dfs" and algorithm not in SOLVERS:
+        raise RequestError(400, f"Unknown solver algorithm: {algorithm!r}")
+    return num_rows, num_cols, seed, generator, algorithm
+
+
+class MazeServer:
+    def __init__(self, workers=None, cache_size=128, cache_bytes=256 << 20):
+        self.cache = LRUCache(cache_size, cache_bytes)
+        # Workers are spawned rather than forked, so they don't inherit open
+        # client connections and keep them from closing
+        self._executor = ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1,
+                                             mp_context=multiprocessing.get_context("spawn"))
+        self._server = None
+
+    async def start(self, host="127.0.0.1", port=8080):
+        self._server = await asyncio.start_server(self.handle, host, port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self._executor.shutdown(cancel_futures=True)
+
+    async def _cached(self, key, size, function, *args):
+        # Share one computation between everyone asking for the same result;
+        # `size` tells the cache how many bytes the result takes once it is in
+        future = self.cache.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+            self.cache.put(key, future)
+
+            def settled(future):
+                if not future.cancelled() and future.exception() is None:
+                    self.cache.resize(key, size(future.result()))
+
+            future.add_done_callback(settled)
+        try:
+            # Shielded, so a client hanging up doesn't cancel it for the others
+            return await asyncio.shield(future)
+        except Exception:
+            self.cache.discard(key)
+            raise
+
+    async def handle(self, reader, writer):
+        """Serve one HTTP request on a new connection."""
+        try:
+            request_line = await reader.readline()
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            try:
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+            except ValueError:
+                raise RequestError(400, "Malformed request line")
+            if method != "GET":
+                raise RequestError(405, "Only GET is supported")
+            url = urlsplit(target)
+            settings = parse_query(url.query)
+
+            if url.path == "/maze":
+                await self._maze(writer, *settings)
+            elif url.path == "/solve":
+                await self._solve(writer, *settings)
+            elif url.path == "/events":
+                await self._events(writer, headers, *settings)
+            else:
+                raise RequestError(404, f"No such endpoint: {url.path}")
+        except RequestError as error:
+            await self._send(writer, error.status, "text/plain", str(error).encode() + b"\n")
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as error:
+            await self._send(writer, 500, "text/plain", f"{error}\n".encode())
+        finally:
+            writer.close()
+
+    async def _maze(self, writer, num_rows, num_cols, seed, generator, algorithm):
+        data = await self._cached(("maze", num_rows, num_cols, seed, generator), len,
+                                  build_maze, num_rows, num_cols, seed, generator)
+        await self._send(writer, 200, "application/octet-stream", data)
+
+    async def _solve(self, writer, num_rows, num_cols, seed, generator, algorithm):
+        chunks = await self._cached(("solve", num_rows, num_cols, seed, generator, algorithm),
+                                    lambda chunks: sum(map(len, chunks)),
+                                    solve_maze, num_rows, num_cols, seed, generator, algorithm,
+                                    CHUNK_CELLS)
+        await self._send_chunked(writer, "application/json", chunks)
+
+    async def _events(self, writer, headers, num_rows, num_cols, seed, generator, algorithm):
+        key = headers.get("sec-websocket-key")
+        if headers.get("upgrade", "").lower() != "websocket" or key is None:
+            raise RequestError(400, "/events needs a WebSocket upgrade")
+        trace = await self._cached(("events", num_rows, num_cols, seed, generator, algorithm),
+                                   lambda trace: trace.nbytes,
+                                   record_maze, num_rows, num_cols, seed, generator, algorithm)
+
+        accept = base64.b64encode(hashlib.sha1(key.encode() + _WEBSOCKET_GUID).digest())
+        writer.write(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+                     b"Connection: Upgrade\r\nSec-WebSocket-Accept: " + accept + b"\r\n\r\n")
+
+        # Decoding and encoding a big trace takes seconds, so each message is
+        # made in a thread while the event loop keeps serving other clients
+        messages = _event_messages(trace)
+        while True:
+            message = await asyncio.to_thread(next, messages, None)
+            if message is None:
+                break
+            await self._send_frame(writer, 0x1, message)
+        await self._send_frame(writer, 0x1, b'{"done": true}')
+        await self._send_frame(writer, 0x8, b"")
+
+    async def _send(self, writer, status, content_type, body):
+        writer.write(f"HTTP/1.1 {status} {_REASONS[status]}\r\nContent-Type: {content_type}\r\n"
+                     f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode())
+        writer.write(body)
+        await writer.drain()
+
+    async def _send_chunked(self, writer, content_type, chunks):
+        writer.write(f"HTTP/1.1 200 OK\r\nContent-Type: {content_type}\r\n"
+                     "Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n".encode())
+        for chunk in chunks:
+            writer.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            # Wait for slow clients instead of buffering the whole response,
+            # and let other clients in between chunks
+            await writer.drain()
+            await asyncio.sleep(0)
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def _send_frame(self, writer, opcode, payload):
+        # A single unmasked WebSocket frame, as servers send them
+        length = len(payload)
+        if length < 126:
+            header = struct.pack("!BB", 0x80 | opcode, length)
+        elif length < 1 << 16:
+            header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+        writer.write(header + payload)
+        await writer.drain()
+        await asyncio.sleep(0)
+
+
+async def serve(host, port, workers, cache_size, cache_bytes):
+    server = MazeServer(workers, cache_size, cache_bytes)
+    host, port = await server.start(host, port)
+    print(f"Serving mazes on http://{host}:{port}", flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve mazes over HTTP and WebSocket.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--cache-size", type=int, default=128, help="results kept in the LRU cache")
+    parser.add_argument("--cache-mb", type=int, default=256, help="megabytes of results kept in the LRU cache")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.cache_size, args.cache_mb << 20))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""
+Maze walls in shared memory, so worker processes can solve without copying.
+
+Sending a Maze to another process pickles the whole thing. A SharedGrid
+puts the wall bytes in a multiprocessing.shared_memory block once; workers
+attach to the block by name and solve against the very same bytes, so only
+the queries and their answers travel between processes:
+
+    with SharedGrid(maze._grid) as shared:
+        results = solve_parallel(shared, [("bfs", (0, 0), (99, 99)), ...])
+
+Cell weights, if the grid has any, are shared the same way in a second
+block. Maze.solve_parallel() does this for a list of (start, goal) pairs.
+"""
+
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+from grid import Grid
+
+
+class SharedGrid:
+    """
+    A copy of a grid's walls in shared memory. The process that creates it
+    owns the block and frees it with unlink() (or by leaving a `with` block).
+    """
+    def __init__(self, grid):
+        self.num_rows = grid.num_rows
+        self.num_cols = grid.num_cols
+        size = grid.num_rows * grid.num_cols
+        walls = grid.walls
+        self._memory = SharedMemory(create=True, size=max(size, 1))
+        # Packed walls are expanded to one byte per cell on the way in
+        self._memory.buf[:size] = walls if isinstance(walls, (bytes, bytearray, memoryview)) else walls[:]
+        self._weights = None
+        if grid.weights is not None:
+            weights = array("l", grid.weights).tobytes()
+            self._weights = SharedMemory(create=True, size=max(len(weights), 1))
+            self._weights.buf[:len(weights)] = weights
+
+    @property
+    def name(self):
+        return self._memory.name
+
+    @property
+    def weights_name(self):
+        return None if self._weights is None else self._weights.name
+
+    def unlink(self):
+        for memory in (self._memory, self._weights):
+            if memory is not None:
+                memory.close()
+                memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.unlink()
+
+
+def attach(name, num_rows, num_cols, weights_name=None):
+    """
+    Attach to the shared walls called `name`, and the weights called
+    `weights_name` if given, from any process. Returns (memories, grid);
+    keep `memories` alive as long as the grid is used.
+    """
+    size = num_rows * num_cols
+    memory = SharedMemory(name=name)
+    grid = Grid(num_rows, num_cols, memory.buf[:size])
+    if weights_name is None:
+        return [memory], grid
+    weights = SharedMemory(name=weights_name)
+    grid.weights = weights.buf[:size * array("l").itemsize].cast("l")
+    return [memory, weights], grid
+
+
+# The maze each worker process solves on, attached once when it starts
+_worker_maze = None
+_worker_memory = None
+
+
+def _start_worker(name, num_rows, num_cols, weights_name):
+    global _worker_maze, _worker_memory
+    # Imported here: maze imports this module for Maze.solve_parallel
+    from maze import Maze
+    _worker_memory, grid = attach(name, num_rows, num_cols, weights_name)
+    _worker_maze = Maze.from_grid(grid)
+
+
+def _solve_query(algorithm, start, goal):
+    return _worker_maze.solve(algorithm, start, goal)
+
+
+def solve_parallel(shared, queries, workers=None):
+    """
+    Answer (algorithm, start, goal) queries against a SharedGrid across
+    `workers` processes (default: all cores), returning a SolveResult for
+    each query in order. Any algorithm Maze.solve() accepts can be used.
+    """
+    queries = list(queries)
+    if not queries:
+        return []
+    workers = min(workers or os.cpu_count() or 1, len(queries))
+    # A few chunks per worker keeps them all busy without a round trip per query
+    chunksize = max(1, len(queries) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_start_worker,
+                             initargs=(shared.name, shared.num_rows, shared.num_cols,
+                                       shared.weights_name)) as executor:
+        return list(executor.map(_solve_query, *zip(*queries), chunksize=chunksize))
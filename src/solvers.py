@@ -0,0 +1,289 @@
+"""
+Maze solving strategies that work directly on a Grid.
+
+Every solver takes a grid, a start cell and a goal cell given as (row, col)
+and returns a SolveResult: the path as a list of (row, col) coordinates from
+start to goal (empty if the goal can't be reached) and the number of cells
+the solver expanded along the way.
+
+If the grid has per-cell `weights`, entering a cell costs its weight instead
+of one step. dijkstra() and astar() find the cheapest path and report its
+cost; the other solvers ignore weights and leave the cost to Maze.solve().
+"""
+
+import heapq
+from array import array
+from collections import deque
+from typing import NamedTuple
+
+from grid import TOP, RIGHT, BOTTOM, LEFT
+
+
+class SolveResult(NamedTuple):
+    path: list
+    expanded: int
+    # Total weight of the cells entered after the start, if known
+    cost: int = None
+
+    def __bool__(self):
+        # A result is truthy when a path was found
+        return bool(self.path)
+
+
+def _neighbour_function(grid):
+    """Return a function listing the open neighbours of a cell index."""
+    walls = grid.walls
+    cols = grid.num_cols
+    last_row_start = (grid.num_rows - 1) * cols
+
+    def neighbours(k):
+        cell_walls = walls[k]
+        result = []
+        if not cell_walls & TOP and k >= cols:
+            result.append(k - cols)
+        if not cell_walls & RIGHT and (k + 1) % cols:
+            result.append(k + 1)
+        if not cell_walls & BOTTOM and k < last_row_start:
+            result.append(k + cols)
+        if not cell_walls & LEFT and k % cols:
+            result.append(k - 1)
+        return result
+
+    return neighbours
+
+
+def _path_from_parents(parent, goal, cols):
+    # Follow parent links back from the goal, then reverse
+    path = []
+    k = goal
+    while k != -1:
+        path.append(divmod(k, cols))
+        k = parent[k]
+    path.reverse()
+    return path
+
+
+def bfs(grid, start, goal):
+    """Breadth-first search. Always finds a shortest path."""
+    cols = grid.num_cols
+    start = grid.index(*start)
+    goal = grid.index(*goal)
+    neighbours = _neighbour_function(grid)
+
+    parent = array("l", [-1]) * len(grid.walls)
+    seen = bytearray(len(grid.walls))
+    seen[start] = 1
+    queue = deque([start])
+    expanded = 0
+    while queue:
+        k = queue.popleft()
+        expanded += 1
+        if k == goal:
+            return SolveResult(_path_from_parents(parent, goal, cols), expanded)
+        for next_k in neighbours(k):
+            if not seen[next_k]:
+                seen[next_k] = 1
+                parent[next_k] = k
+                queue.append(next_k)
+    return SolveResult([], expanded)
+
+
+def _cheapest_path(grid, start, goal, guided):
+    """
+    Best-first search on a binary heap, always expanding the cell with the
+    lowest known cost plus, if `guided`, a lower bound on the cost still to
+    go: the Manhattan distance to the goal times the smallest weight.
+    """
+    cols = grid.num_cols
+    weights = grid.weights
+    goal_i, goal_j = goal
+    start = grid.index(*start)
+    goal = grid.index(*goal)
+    neighbours = _neighbour_function(grid)
+    scale = (min(weights) if weights is not None else 1) if guided else 0
+
+    def heuristic(k):
+        i, j = divmod(k, cols)
+        return scale * (abs(i - goal_i) + abs(j - goal_j))
+
+    size = len(grid.walls)
+    parent = array("l", [-1]) * size
+    # Cheapest known cost of reaching each cell, -1 if not reached yet
+    cost = array("q", [-1]) * size
+    cost[start] = 0
+    closed = bytearray(size)
+    # Ties on f are broken towards the smaller heuristic, i.e. deeper cells
+    h = heuristic(start)
+    heap = [(h, h, start)]
+    expanded = 0
+    while heap:
+        _, _, k = heapq.heappop(heap)
+        if closed[k]:
+            continue
+        closed[k] = 1
+        expanded += 1
+        if k == goal:
+            return SolveResult(_path_from_parents(parent, goal, cols), expanded, cost[goal])
+        base = cost[k]
+        for next_k in neighbours(k):
+            if closed[next_k]:
+                continue
+            next_cost = base + (weights[next_k] if weights is not None else 1)
+            known = cost[next_k]
+            if 0 <= known <= next_cost:
+                continue
+            cost[next_k] = next_cost
+            parent[next_k] = k
+            h = heuristic(next_k)
+            heapq.heappush(heap, (next_cost + h, h, next_k))
+    return SolveResult([], expanded)
+
+
+def astar(grid, start, goal):
+    """
+    A* search with the Manhattan distance to the goal as heuristic.
+    Finds the cheapest path, which is a shortest path on unweighted grids.
+    """
+    return _cheapest_path(grid, start, goal, True)
+
+
+def dijkstra(grid, start, goal):
+    """Dijkstra's algorithm: the cheapest path, expanding cells in order of cost."""
+    return _cheapest_path(grid, start, goal, False)
+
+
+def bidirectional_bfs(grid, start, goal):
+    """Breadth-first search from both ends, always growing the smaller frontier."""
+    cols = grid.num_cols
+    start = grid.index(*start)
+    goal = grid.index(*goal)
+    if start == goal:
+        return SolveResult([divmod(start, cols)], 1)
+    neighbours = _neighbour_function(grid)
+
+    size = len(grid.walls)
+    parents = (array("l", [-1]) * size, array("l", [-1]) * size)
+    # 0 unseen, 1 seen from start, 2 seen from goal
+    side = bytearray(size)
+    side[start] = 1
+    side[goal] = 2
+    frontiers = ([start], [goal])
+    expanded = 0
+    while frontiers[0] and frontiers[1]:
+        s = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        mark = s + 1
+        parent = parents[s]
+        next_frontier = []
+        for k in frontiers[s]:
+            expanded += 1
+            for next_k in neighbours(k):
+                if side[next_k] == mark:
+                    continue
+                if side[next_k]:
+                    # The two searches meet on the edge k -> next_k
+                    if s == 0:
+                        return SolveResult(_join(parents, k, next_k, cols), expanded)
+                    return SolveResult(_join(parents, next_k, k, cols), expanded)
+                side[next_k] = mark
+                parent[next_k] = k
+                next_frontier.append(next_k)
+        frontiers = (next_frontier, frontiers[1]) if s == 0 else (frontiers[0], next_frontier)
+    return SolveResult([], expanded)
+
+
+def _join(parents, from_start, from_goal, cols):
+    # Path to the meeting edge from the start, then back out to the goal
+    path = _path_from_parents(parents[0], from_start, cols)
+    k = from_goal
+    while k != -1:
+        path.append(divmod(k, cols))
+        k = parents[1][k]
+    return path
+
+
+def dead_end_filling(grid, start, goal):
+    """
+    Fill in dead ends until only the route between start and goal is left.
+    In a perfect maze what remains is exactly the solution; otherwise the
+    remaining cells are searched breadth-first.
+    """
+    cols = grid.num_cols
+    start = grid.index(*start)
+    goal = grid.index(*goal)
+    neighbours = _neighbour_function(grid)
+
+    size = len(grid.walls)
+    degree = bytearray(size)
+    dead_ends = []
+    for k in range(size):
+        degree[k] = len(neighbours(k))
+        if degree[k] <= 1 and k != start and k != goal:
+            dead_ends.append(k)
+
+    # Fill each dead end and follow the corridor it leads into
+    filled = bytearray(size)
+    expanded = 0
+    while dead_ends:
+        k = dead_ends.pop()
+        if filled[k]:
+            continue
+        filled[k] = 1
+        expanded += 1
+        for next_k in neighbours(k):
+            if filled[next_k]:
+                continue
+            degree[next_k] -= 1
+            if degree[next_k] <= 1 and next_k != start and next_k != goal:
+                dead_ends.append(next_k)
+
+    # Walk the unfilled cells from start to goal
+    parent = array("l", [-1]) * size
+    filled[start] = 1
+    queue = deque([start])
+    while queue:
+        k = queue.popleft()
+        expanded += 1
+        if k == goal:
+            return SolveResult(_path_from_parents(parent, goal, cols), expanded)
+        for next_k in neighbours(k):
+            if not filled[next_k]:
+                filled[next_k] = 1
+                parent[next_k] = k
+                queue.append(next_k)
+    return SolveResult([], expanded)
+
+
+def distance_field(grid, source):
+    """
+    Breadth-first search from `source` over the whole grid.
+    Returns (distance, parent) arrays indexed by cell: the number of steps
+    from each cell to the source (-1 if unreachable), and the next cell on
+    a shortest route towards the source (-1 for the source itself).
+    """
+    source = grid.index(*source)
+    neighbours = _neighbour_function(grid)
+
+    size = len(grid.walls)
+    distance = array("l", [-1]) * size
+    parent = array("l", [-1]) * size
+    distance[source] = 0
+    queue = deque([source])
+    while queue:
+        k = queue.popleft()
+        next_distance = distance[k] + 1
+        for next_k in neighbours(k):
+            if distance[next_k] < 0:
+                distance[next_k] = next_distance
+                parent[next_k] = k
+                queue.append(next_k)
+    return distance, parent
+
+
+# Solvers selectable by name through Maze.solve(algorithm=...)
+SOLVERS = {
+    "bfs": bfs,
+    "astar": astar,
+    "dijkstra": dijkstra,
+    "bidirectional": bidirectional_bfs,
+    "dead_end": dead_end_filling,
+}
@@ -0,0 +1,62 @@
+"""
+Opt-in instrumentation for Maze runs.
+
+Pass `stats=True` to Maze to collect a Stats object (available as
+`maze.stats`), and/or `hooks={name: callback}` to be called as things happen:
+
+    "visit"       callback(i, j)          a cell is entered
+    "backtrack"   callback(i, j)          a cell is left as a dead end
+    "wall_break"  callback(i, j, wall)    a wall of cell (i, j) is removed
+    "phase"       callback(name, seconds) "generate" or "solve" finished
+
+When neither is given nothing is collected or called.
+
+The backtracker and the "dfs" solver call the hooks step by step. The
+whole-grid generators call "visit" for every cell and "wall_break" for
+every passage once they are done, and braiding calls "wall_break" for each
+wall it opens. The other solvers only return how many cells they expanded,
+so they count towards `cells_visited` but never call "visit" or
+"backtrack".
+"""
+
+HOOK_NAMES = ("visit", "backtrack", "wall_break", "phase")
+
+
+class Stats:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.cells_visited = 0
+        self.backtracks = 0
+        self.max_stack_depth = 0
+        self.wall_breaks = 0
+        self.draw_calls = 0
+        self.animate_seconds = 0.0
+        self.phase_seconds = {}
+
+    @property
+    def compute_seconds(self):
+        # Time spent in the phases other than waiting on the animation
+        return sum(self.phase_seconds.values()) - self.animate_seconds
+
+    def as_dict(self):
+        return {
+            "cells_visited": self.cells_visited,
+            "backtracks": self.backtracks,
+            "max_stack_depth": self.max_stack_depth,
+            "wall_breaks": self.wall_breaks,
+            "draw_calls": self.draw_calls,
+            "animate_seconds": self.animate_seconds,
+            "compute_seconds": self.compute_seconds,
+            "phase_seconds": dict(self.phase_seconds),
+        }
+
+
+def check_hooks(hooks):
+    """Return hooks as a dict, rejecting names that are never called."""
+    hooks = dict(hooks or {})
+    for name in hooks:
+        if name not in HOOK_NAMES:
+            raise ValueError(f"Unknown hook: {name!r}")
+    return hooks
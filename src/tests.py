@@ -1,6 +1,35 @@
+import io
+import json
+import os
+import queue
+import random
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import threading
 import unittest
+import zlib
 from maze import Maze
-from unittest.mock import MagicMock
+from grid import Grid, LEFT, TOP, RIGHT, BOTTOM
+from solvers import bfs
+from render import wall_segments, tile_ppm, _pixel_rows
+from animation import Animation
+from graphics import Window
+from unittest.mock import MagicMock, patch
+import batch
+import bench
+import numpy_backend
+import events
+import generators
+from sharedgrid import SharedGrid, attach
+from cell import CellGrid
+import main
+import tracefile
+from tracefile import Trace, TracePlayer, TraceError
+import server
+import asyncio
 
 class Tests(unittest.TestCase):
   def test_maze_create_cells(self):
@@ -183,7 +212,7 @@ class Tests(unittest.TestCase):
 
   def test_solve_maze(self):
     # Create a small maze with a fixed seed for consistent testing
-    m1 = Maze(0, 0, 3, 3, 10, 10, seed=42)
+    m1 = Maze(0, 0, 3, 3, 10, 10, MagicMock(), seed=42, animation=Animation(instant=True))
     
     # Mock the draw_move method to avoid any graphical operations
     for i in range(m1._num_rows):
@@ -208,5 +237,889 @@ class Tests(unittest.TestCase):
     
     self.assertGreater(move_calls, 0, "At least some moves should have been drawn")
 
+  def test_large_maze_does_not_recurse(self):
+    # A maze this size used to exceed Python's recursion limit
+    num_rows = 150
+    num_cols = 150
+    m1 = Maze(0, 0, num_rows, num_cols, 10, 10, seed=7)
+
+    # Generation must still produce a perfect maze
+    broken_walls_count = 0
+    for i in range(num_rows):
+        for j in range(num_cols):
+            if j < num_cols - 1 and not m1._cells[i][j].has_right_wall:
+                broken_walls_count += 1
+            if i < num_rows - 1 and not m1._cells[i][j].has_bottom_wall:
+                broken_walls_count += 1
+    self.assertEqual(broken_walls_count, num_rows * num_cols - 1)
+
+    # Solving headless must not raise either
+    self.assertTrue(m1.solve())
+    self.assertTrue(m1._cells[num_rows-1][num_cols-1].visited)
+
+  def test_cells_are_views_of_packed_grid(self):
+    m1 = Maze(0, 0, 3, 4, 10, 10, seed=42)
+
+    # Walls are stored one byte per cell
+    self.assertEqual(len(m1._grid.walls), 3 * 4)
+
+    # Changes through a Cell show up in the grid and vice versa
+    m1._cells[1][2].has_left_wall = True
+    self.assertTrue(m1._grid.has_wall(1, 2, LEFT))
+    m1._grid.set_wall(1, 2, LEFT, False)
+    self.assertFalse(m1._cells[1][2].has_left_wall)
+
+    m1._cells[2][3].visited = True
+    self.assertEqual(m1._grid.visited[m1._grid.index(2, 3)], 1)
+
+    # The same view is handed out on every access
+    self.assertIs(m1._cells[0][1], m1._cells[0][1])
+
+  def assert_valid_path(self, m, path, start, goal):
+    # Every step must move to an adjacent cell through an open wall
+    self.assertEqual(path[0], start)
+    self.assertEqual(path[-1], goal)
+    walls = {(-1, 0): "has_top_wall", (0, 1): "has_right_wall",
+             (1, 0): "has_bottom_wall", (0, -1): "has_left_wall"}
+    for (i, j), (next_i, next_j) in zip(path, path[1:]):
+      wall = walls[(next_i - i, next_j - j)]
+      self.assertFalse(getattr(m._cells[i][j], wall), f"Wall between ({i}, {j}) and ({next_i}, {next_j})")
+
+  def test_solve_algorithms(self):
+    m1 = Maze(0, 0, 15, 20, 10, 10, seed=3)
+    start = (0, 0)
+    goal = (14, 19)
+
+    dfs = m1.solve()
+    self.assertTrue(dfs)
+    self.assert_valid_path(m1, dfs.path, start, goal)
+
+    # A perfect maze has exactly one route, so every solver finds the same one
+    for algorithm in ["bfs", "astar", "bidirectional", "dead_end"]:
+      result = m1.solve(algorithm)
+      self.assertTrue(result, algorithm)
+      self.assert_valid_path(m1, result.path, start, goal)
+      self.assertEqual(result.path, dfs.path, algorithm)
+      self.assertGreater(result.expanded, 0)
+
+    with self.assertRaises(ValueError):
+      m1.solve("teleport")
+
+  def assert_perfect(self, m):
+    # n - 1 open interior walls plus every cell reachable means exactly one route
+    broken_walls_count = 0
+    for i in range(m._num_rows):
+        for j in range(m._num_cols):
+            if j < m._num_cols - 1 and not m._cells[i][j].has_right_wall:
+                broken_walls_count += 1
+            if i < m._num_rows - 1 and not m._cells[i][j].has_bottom_wall:
+                broken_walls_count += 1
+    self.assertEqual(broken_walls_count, m._num_rows * m._num_cols - 1)
+
+    seen = {(0, 0)}
+    stack = [(0, 0)]
+    while stack:
+      i, j = stack.pop()
+      cell = m._cells[i][j]
+      for wall, next_i, next_j in [("has_top_wall", i - 1, j), ("has_right_wall", i, j + 1),
+                                   ("has_bottom_wall", i + 1, j), ("has_left_wall", i, j - 1)]:
+        if not getattr(cell, wall) and 0 <= next_i < m._num_rows and 0 <= next_j < m._num_cols \
+            and (next_i, next_j) not in seen:
+          seen.add((next_i, next_j))
+          stack.append((next_i, next_j))
+    self.assertEqual(len(seen), m._num_rows * m._num_cols)
+
+  def test_generators(self):
+    for generator in ["backtracker", "kruskal", "prim", "eller", "wilson", "binary_tree", "sidewinder",
+                      "tiled"]:
+      m1 = Maze(0, 0, 9, 13, 10, 10, seed=5, generator=generator)
+      self.assert_perfect(m1)
+
+      # Entrance and exit are still open
+      self.assertFalse(m1._cells[0][0].has_top_wall, generator)
+      self.assertFalse(m1._cells[8][12].has_bottom_wall, generator)
+
+      # The same seed gives the same maze
+      m2 = Maze(0, 0, 9, 13, 10, 10, seed=5, generator=generator)
+      self.assertEqual(m1._grid.walls, m2._grid.walls, generator)
+
+      # Single rows and columns are corridors
+      for num_rows, num_cols in ((1, 7), (7, 1)):
+        m3 = Maze(0, 0, num_rows, num_cols, 10, 10, seed=3, generator=generator)
+        self.assert_perfect(m3)
+        self.assertEqual(len(m3.solve("bfs").path), num_rows * num_cols, generator)
+
+    for num_rows, num_cols in ((1, 7), (7, 1)):
+      m4 = Maze(0, 0, num_rows, num_cols, 10, 10, seed=3, generator="kruskal", backend="numpy")
+      self.assert_perfect(m4)
+      self.assertEqual(len(m4.solve("bfs").path), num_rows * num_cols)
+      # Braiding a corridor has no dead ends to open
+      self.assertEqual(generators.braid(m4._grid, random.Random(1), 1.0), [])
+
+    with self.assertRaises(ValueError):
+      Maze(0, 0, 3, 3, 10, 10, generator="dig")
+
+  def test_stream_rows(self):
+    num_rows = 40
+    num_cols = 7
+    rows = list(Maze.stream_rows(num_rows, num_cols, seed=11))
+    self.assertEqual(len(rows), num_rows)
+    self.assertTrue(all(len(row) == num_cols for row in rows))
+
+    # Entrance and exit are carved
+    self.assertFalse(rows[0][0] & TOP)
+    self.assertFalse(rows[-1][-1] & BOTTOM)
+
+    # The same seed streams the same rows
+    self.assertEqual(rows, list(Maze.stream_rows(num_rows, num_cols, seed=11)))
+
+    # Put together, the rows form a solvable maze
+    grid = Grid(num_rows, num_cols, bytearray().join(rows))
+    self.assertTrue(bfs(grid, (0, 0), (num_rows - 1, num_cols - 1)))
+
+  def test_save_and_load(self):
+    m1 = Maze(0, 0, 9, 11, 10, 10, seed=8, generator="kruskal")
+    with tempfile.TemporaryDirectory() as directory:
+      path = os.path.join(directory, "maze.bin")
+      m1.save(path)
+
+      # Four bits per cell after the header
+      self.assertLess(os.path.getsize(path), 64 + (9 * 11 + 1) // 2)
+
+      m2 = Maze.load(path)
+      self.assertEqual(m2._grid.walls.unpack(), m1._grid.walls)
+      self.assertEqual(m2._seed, 8)
+      self.assertEqual(m2._generator, "kruskal")
+      self.assertEqual(m2.solve("bfs").path, m1.solve("bfs").path)
+      self.assertEqual(m2.solve().path, m1.solve().path)
+
+      # Saving a loaded maze writes the same file again
+      path2 = os.path.join(directory, "copy.bin")
+      m2.save(path2)
+      with open(path, "rb") as f1, open(path2, "rb") as f2:
+        self.assertEqual(f1.read(), f2.read())
+
+      # Loaded mazes take the same stats, hooks and events options
+      seen = []
+      m3 = Maze.load(path, stats=True, hooks={"visit": lambda i, j: None}, events=seen.append)
+      result = m3.solve()
+      self.assertEqual(m3.stats.cells_visited, result.expanded)
+      self.assertEqual(seen[0], events.PhaseStarted("solve"))
+      with self.assertRaises(ValueError):
+        Maze.load(path, backend="fortran")
+
+  def test_wall_segments_merge_runs(self):
+    # A single cell with entrance and exit open only has its side walls
+    m1 = Maze(0, 0, 1, 1, 10, 10)
+    self.assertEqual(sorted(wall_segments(m1._grid, 0, 0, 10, 10)), [(0, 0, 0, 10), (10, 0, 10, 10)])
+
+    # Every standing wall is covered once, by fewer lines than walls
+    m2 = Maze(0, 0, 12, 12, 1, 1, seed=4)
+    segments = wall_segments(m2._grid, 0, 0, 1, 1)
+    total_length = sum(abs(x2 - x1) + abs(y2 - y1) for x1, y1, x2, y2 in segments)
+    wall_count = 0
+    for i in range(12):
+      for j in range(12):
+        cell = m2._cells[i][j]
+        wall_count += cell.has_top_wall + cell.has_left_wall
+        wall_count += (j == 11 and cell.has_right_wall) + (i == 11 and cell.has_bottom_wall)
+    self.assertEqual(total_length, wall_count)
+    self.assertLess(len(segments), wall_count)
+
+  def test_export_image(self):
+    m1 = Maze(0, 0, 4, 6, 10, 10, seed=2)
+    with tempfile.TemporaryDirectory() as directory:
+      png_path = os.path.join(directory, "maze.png")
+      m1.export_image(png_path, cell_px=5)
+      with open(png_path, "rb") as f:
+        data = f.read()
+      self.assertEqual(data[:8], b"\x89PNG\r\n\x1a\n")
+      width, height = struct.unpack(">II", data[16:24])
+      self.assertEqual((width, height), (6 * 5 + 1, 4 * 5 + 1))
+
+      # Rows decode to a filter byte plus one byte per pixel
+      idat = data.index(b"IDAT")
+      length = struct.unpack(">I", data[idat - 4:idat])[0]
+      pixels = zlib.decompress(data[idat + 4:idat + 4 + length])
+      self.assertEqual(len(pixels), height * (width + 1))
+
+      # The entrance is open at the top-left, the corner post is black
+      self.assertEqual(pixels[1], 0)
+      self.assertEqual(pixels[3], 255)
+
+      ppm_path = os.path.join(directory, "maze.ppm")
+      m1.export_image(ppm_path, cell_px=5)
+      with open(ppm_path, "rb") as f:
+        self.assertTrue(f.read().startswith(b"P6\n31 21\n255\n"))
+
+  def test_animation_batches_redraws(self):
+    mock_win = MagicMock()
+
+    # Ten steps per frame: 2x2 maze with ~13 steps means only a couple of redraws
+    Maze(0, 0, 2, 2, 10, 10, mock_win, seed=1, animation=Animation(fps=1000, steps_per_frame=10))
+    self.assertLessEqual(mock_win.redraw.call_count, 3)
+
+    # Instant mode redraws once per phase and never waits
+    mock_win.reset_mock()
+    m1 = Maze(0, 0, 20, 20, 10, 10, mock_win, seed=1, animation=Animation(instant=True))
+    self.assertEqual(mock_win.redraw.call_count, 1)
+    m1.solve()
+    self.assertEqual(mock_win.redraw.call_count, 2)
+
+  def test_animation_max_duration_scales_steps(self):
+    # 1000 steps squeezed into 2 seconds at 10 fps is 50 steps a frame
+    animation = Animation(fps=10, max_duration=2)
+    animation.begin(1000)
+    self.assertEqual(animation._batch, 50)
+
+    # A maze that would take ~15 seconds at one step per frame finishes in bounded time
+    start = time.perf_counter()
+    Maze(0, 0, 10, 10, 10, 10, MagicMock(), seed=1, animation=Animation(fps=50, max_duration=0.2))
+    self.assertLess(time.perf_counter() - start, 1)
+
+  def make_offscreen_window(self):
+    # A Window whose Tk root and canvas are mocks, so no display is needed
+    win = Window.__new__(Window)
+    win._Window__root = MagicMock()
+    win._Window__canvas = MagicMock()
+    win._Window__canvas.create_line.side_effect = range(1, 10**6)
+    win._Window__items = {}
+    return win
+
+  def test_redraws_reuse_canvas_items(self):
+    num_rows = 6
+    num_cols = 7
+    win = self.make_offscreen_window()
+    canvas = win._Window__canvas
+    m1 = Maze(0, 0, num_rows, num_cols, 10, 10, win, seed=1, animation=Animation(instant=True))
+
+    # One item per wall line, however often each cell was redrawn
+    wall_lines = num_rows * (num_cols + 1) + (num_rows + 1) * num_cols
+    self.assertEqual(canvas.create_line.call_count, wall_lines)
+    self.assertGreater(canvas.itemconfig.call_count, 0)
+
+    # At most one item per move, even for moves that were undone
+    m1.solve()
+    self.assertLessEqual(canvas.create_line.call_count, wall_lines + num_rows * num_cols - 1)
+
+    # Clearing the canvas forgets the items
+    win.clear_canvas()
+    self.assertEqual(win._Window__items, {})
+
+  def test_batch_cli_streams_json_lines(self):
+    out = io.StringIO()
+    with patch("sys.stdout", out):
+      batch.main(["--rows", "6", "--cols", "5", "--count", "3", "--seed-start", "10", "--workers", "1"])
+    results = [json.loads(line) for line in out.getvalue().splitlines()]
+    self.assertEqual([r["seed"] for r in results], [10, 11, 12])
+    for r in results:
+      self.assertTrue(r["solved"])
+      self.assertGreaterEqual(r["cells_visited"], r["path_length"])
+
+    # Worker processes give the same results as running in-process
+    pooled = list(batch.run_batch(6, 5, 3, seed_start=10, workers=2))
+    self.assertEqual([r["path_length"] for r in pooled], [r["path_length"] for r in results])
+
+  def test_seeded_mazes_are_reproducible_across_threads(self):
+    expected = {seed: bytes(Maze(0, 0, 30, 30, 1, 1, seed=seed)._grid.walls) for seed in range(4)}
+
+    # The global random state is left alone
+    random.seed(123)
+    before = random.getstate()
+    Maze(0, 0, 10, 10, 1, 1, seed=1, generator="prim")
+    self.assertEqual(random.getstate(), before)
+
+    # Mazes built in parallel threads still match their seeds bit for bit
+    results = {}
+    def build(seed):
+      for _ in range(3):
+        walls = bytes(Maze(0, 0, 30, 30, 1, 1, seed=seed)._grid.walls)
+        results.setdefault(seed, set()).add(walls)
+    threads = [threading.Thread(target=build, args=(seed,)) for seed in range(4)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    self.assertEqual(results, {seed: {walls} for seed, walls in expected.items()})
+
+  @unittest.skipUnless(numpy_backend.HAVE_NUMPY, "NumPy is not installed")
+  def test_numpy_backend(self):
+    for generator in ["binary_tree", "sidewinder", "kruskal"]:
+      m1 = Maze(0, 0, 11, 9, 10, 10, seed=6, generator=generator, backend="numpy")
+      self.assert_perfect(m1)
+      self.assertFalse(m1._cells[0][0].has_top_wall, generator)
+      self.assertFalse(m1._cells[10][8].has_bottom_wall, generator)
+
+      # Still reproducible per seed
+      m2 = Maze(0, 0, 11, 9, 10, 10, seed=6, generator=generator, backend="numpy")
+      self.assertEqual(m1._grid.walls, m2._grid.walls, generator)
+
+      # The NumPy BFS finds the same shortest path as the pure-Python one,
+      # whether it expands the frontiers as arrays or one cell at a time
+      self.assertEqual(m1.solve("bfs").path, bfs(m1._grid, (0, 0), (10, 8)).path)
+      with patch.object(numpy_backend, "NARROW_FRONTIER", 1):
+        self.assertEqual(m1.solve("bfs").path, bfs(m1._grid, (0, 0), (10, 8)).path)
+
+  @unittest.skipUnless(numpy_backend.HAVE_NUMPY, "NumPy is not installed")
+  def test_numpy_bfs_not_slower_on_corridors(self):
+    # A backtracker maze's frontier is a few cells wide, which the NumPy BFS
+    # walks in Python instead of paying for array operations on every level
+    m1 = Maze(0, 0, 400, 400, 1, 1, seed=2)
+    goal = (399, 399)
+    with patch.object(numpy_backend.np, "concatenate", wraps=numpy_backend.np.concatenate) as concatenate:
+      result = numpy_backend.bfs(m1._grid, (0, 0), goal)
+    self.assertEqual(result.path, bfs(m1._grid, (0, 0), goal).path)
+    self.assertLess(concatenate.call_count, len(result.path) // 10)
+
+    timings = {}
+    for name, solver in (("python", bfs), ("numpy", numpy_backend.bfs)):
+      start = time.perf_counter()
+      solver(m1._grid, (0, 0), goal)
+      timings[name] = time.perf_counter() - start
+    self.assertLess(timings["numpy"], 1.5 * timings["python"] + 0.05)
+
+  def test_numpy_backend_falls_back(self):
+    # Algorithms without a NumPy version use the pure-Python one
+    m1 = Maze(0, 0, 8, 8, 10, 10, seed=6, generator="prim", backend="numpy")
+    m2 = Maze(0, 0, 8, 8, 10, 10, seed=6, generator="prim")
+    self.assertEqual(m1._grid.walls, m2._grid.walls)
+    self.assertEqual(m1.solve("astar").path, m2.solve("astar").path)
+
+    with self.assertRaises(ValueError):
+      Maze(0, 0, 3, 3, 10, 10, backend="fortran")
+
+  def test_distance_field_queries(self):
+    m1 = Maze(0, 0, 10, 12, 10, 10, seed=9)
+    goal = (9, 11)
+    for start in [(0, 0), (4, 7), (9, 0), goal]:
+      expected = bfs(m1._grid, start, goal).path
+      self.assertEqual(m1.path_from(*start), expected)
+      self.assertEqual(m1.distance_from(*start), len(expected) - 1)
+
+    # The field is only built once for many queries
+    field = m1._exit_field
+    m1.path_from(3, 3)
+    self.assertIs(m1._exit_field, field)
+
+    # Changing a wall rebuilds it: sealing the exit cell off makes it unreachable
+    m1._cells[9][11].has_top_wall = True
+    m1._cells[9][11].has_left_wall = True
+    m1._cells[8][11].has_bottom_wall = True
+    m1._cells[9][10].has_right_wall = True
+    self.assertIsNone(m1.distance_from(0, 0))
+    self.assertEqual(m1.path_from(0, 0), [])
+
+    # Cells outside the maze are refused rather than wrapped around
+    for cell in ((-1, 0), (0, -1), (10, 0), (0, 12)):
+      with self.assertRaises(ValueError):
+        m1.distance_from(*cell)
+      with self.assertRaises(ValueError):
+        m1.path_from(*cell)
+
+  def test_solve_between_any_cells(self):
+    m1 = Maze(0, 0, 12, 10, 10, 10, seed=13)
+    start = (7, 2)
+    goal = (1, 8)
+    expected = bfs(m1._grid, start, goal).path
+    for algorithm in ["dfs", "bfs", "astar", "bidirectional", "dead_end"]:
+      result = m1.solve(algorithm, start=start, goal=goal)
+      self.assert_valid_path(m1, result.path, start, goal)
+      self.assertEqual(result.path, expected, algorithm)
+
+    with self.assertRaises(ValueError):
+      m1.solve(start=(12, 0))
+
+  def test_solve_many(self):
+    m1 = Maze(0, 0, 15, 15, 10, 10, seed=21)
+    rng = random.Random(0)
+    cells = [(i, j) for i in range(15) for j in range(15)]
+    pairs = [(rng.choice(cells), rng.choice(cells)) for _ in range(200)]
+    results = m1.solve_many(pairs)
+    self.assertEqual(len(results), len(pairs))
+    for (start, goal), result in zip(pairs, results):
+      self.assertEqual(result.path, bfs(m1._grid, start, goal).path)
+
+    # With a loop in the maze it falls back to searching each pair
+    j = next(j for j in range(14) if m1._cells[5][j].has_right_wall)
+    m1._grid.remove_wall(5, j, RIGHT)
+    for (start, goal), result in zip(pairs, m1.solve_many(pairs)):
+      self.assertEqual(len(result.path), len(bfs(m1._grid, start, goal).path))
+
+  def test_bench_reports_every_phase(self):
+    report = bench.run([4, 8], generator="eller", algorithm="bfs")
+    self.assertEqual([r["cells"] for r in report["results"]], [16, 64])
+    for r in report["results"]:
+      for key in ["construct_seconds", "construct_cells_per_second", "solve_seconds",
+                  "solve_cells_per_second", "render_seconds", "export_png_seconds",
+                  "construct_peak_bytes", "solve_peak_bytes"]:
+        self.assertGreater(r[key], 0, key)
+    json.dumps(report)
+
+  def test_stats(self):
+    m1 = Maze(0, 0, 12, 10, 10, 10, seed=4, stats=True)
+    stats = m1.stats
+    # The backtracker enters every cell once and opens a spanning tree
+    self.assertEqual(stats.cells_visited, 120)
+    self.assertEqual(stats.wall_breaks, 119)
+    self.assertEqual(stats.backtracks, 120)
+    self.assertGreater(stats.max_stack_depth, 1)
+    self.assertIn("generate", stats.phase_seconds)
+
+    stats.reset()
+    result = m1.solve()
+    self.assertEqual(stats.cells_visited, result.expanded)
+    self.assertEqual(stats.max_stack_depth, len(result.path))
+    self.assertIn("solve", stats.phase_seconds)
+    json.dumps(stats.as_dict())
+
+    m2 = Maze(0, 0, 12, 10, 10, 10, seed=4, generator="wilson", stats=True)
+    self.assertEqual(m2.stats.wall_breaks, 119)
+    self.assertIsNone(Maze(0, 0, 3, 3, 10, 10, seed=4).stats)
+
+  def test_hooks(self):
+    events = []
+    hooks = {
+      "visit": lambda i, j: events.append(("visit", i, j)),
+      "backtrack": lambda i, j: events.append(("backtrack", i, j)),
+      "wall_break": lambda i, j, wall: events.append(("wall_break", i, j, wall)),
+      "phase": lambda name, seconds: events.append(("phase", name)),
+    }
+    m1 = Maze(0, 0, 6, 5, 10, 10, seed=8, hooks=hooks)
+    kinds = [event[0] for event in events]
+    self.assertEqual(kinds.count("visit"), 30)
+    self.assertEqual(kinds.count("wall_break"), 29)
+    self.assertEqual(events[0], ("visit", 0, 0))
+    self.assertEqual(events[-1], ("phase", "generate"))
+    for _, i, j, wall in (event for event in events if event[0] == "wall_break"):
+      self.assertFalse(m1._grid.has_wall(i, j, wall))
+
+    del events[:]
+    m1.solve()
+    self.assertEqual(events[-1], ("phase", "solve"))
+    self.assertIn(("visit", 5, 4), events)
+
+    # Whole-grid generators and braiding call the same hooks stats counts
+    del events[:]
+    m2 = Maze(0, 0, 12, 10, 10, 10, seed=8, generator="kruskal", braid=0.5, stats=True, hooks=hooks)
+    kinds = [event[0] for event in events]
+    self.assertEqual(kinds.count("wall_break"), m2.stats.wall_breaks)
+    self.assertEqual(kinds.count("visit"), m2.stats.cells_visited)
+    self.assertGreater(m2.stats.wall_breaks, 12 * 10 - 1)
+    for _, i, j, wall in (event for event in events if event[0] == "wall_break"):
+      self.assertFalse(m2._grid.has_wall(i, j, wall))
+
+    with self.assertRaises(ValueError):
+      Maze(0, 0, 3, 3, 10, 10, hooks={"draw": print})
+
+  def test_event_stream(self):
+    # Build and solve headless in a worker thread, then draw from the queue
+    source = queue.SimpleQueue()
+    def work():
+      m1 = Maze(0, 0, 8, 9, 10, 10, seed=6, events=source.put)
+      result = m1.solve()
+      finished.append((m1, result))
+    finished = []
+    worker = threading.Thread(target=work)
+    worker.start()
+    worker.join()
+    m1, result = finished[0]
+
+    win = self.make_offscreen_window()
+    renderer = events.EventRenderer(win, 0, 0, 8, 9, 10, 10)
+    self.assertEqual(renderer.drain(source, limit=5), 5)
+    renderer.drain(source)
+    self.assertTrue(source.empty())
+    self.assertEqual(bytes(renderer._grid.walls), bytes(m1._grid.walls))
+    self.assertEqual([divmod(k, 9) for k in renderer._stack], result.path)
+    self.assertGreater(win._Window__canvas.create_line.call_count, 0)
+
+    # Whole-grid generators and solvers report their results as events too
+    received = []
+    m2 = Maze(0, 0, 5, 6, 10, 10, seed=2, generator="kruskal", events=received.append)
+    result = m2.solve("bfs")
+    self.assertEqual(received[0], events.PhaseStarted("generate"))
+    self.assertEqual(received[-1], events.PathFound(result.path))
+    walls_removed = [e for e in received if isinstance(e, events.WallRemoved)]
+    self.assertEqual(len(walls_removed), 5 * 6 - 1 + 2)
+
+    # Playing drains on the window's own timer
+    renderer.play(source, fps=50)
+    win._Window__root.after.assert_called_once()
+    renderer.stop()
+
+  def test_main_computes_in_background(self):
+    win = self.make_offscreen_window()
+    win._Window__is_running = True
+    win.show_popup = MagicMock()
+    pending = []
+    win._Window__root.after.side_effect = lambda delay, callback: pending.append(callback)
+    def run_frames():
+      # Stand in for the Tk main loop: run scheduled frames until the popup shows
+      while not win.show_popup.called:
+        time.sleep(0.001)
+        pending.pop(0)()
+      self.assertEqual(pending, [])
+    win._Window__root.mainloop.side_effect = run_frames
+
+    with patch("main.Window", return_value=win):
+      main.main()
+    message, restart = win.show_popup.call_args[0]
+    self.assertIn("Success", message)
+    self.assertGreater(win._Window__canvas.create_line.call_count, 0)
+
+    # Restart builds and solves a new maze the same way
+    win.show_popup.reset_mock()
+    restart()
+    run_frames()
+    self.assertIn("Success", win.show_popup.call_args[0][0])
+
+  def test_trace_record_and_replay(self):
+    recorded = []
+    trace = Trace(20, 25, keyframe_every=64)
+    def sink(event):
+      recorded.append(event)
+      trace(event)
+    m1 = Maze(0, 0, 20, 25, 10, 10, seed=9, events=sink)
+    m1.solve()
+    m1.solve("astar", start=(3, 4), goal=(19, 0))
+
+    # About one byte per event, plus one per cell of each found path,
+    # and it reads back exactly
+    path_cells = sum(len(e.path) for e in recorded if isinstance(e, events.PathFound))
+    self.assertEqual(len(trace), len(recorded))
+    self.assertLess(len(trace._data), 1.1 * (len(recorded) + path_cells))
+    self.assertEqual(list(trace.events()), recorded)
+    self.assertEqual(list(trace.events(300, 1000)), recorded[300:1000])
+
+    # Seeking rebuilds the walls as they stood at that step
+    generated = recorded.index(events.PhaseStarted("solve"))
+    walls, route, solving = trace.state_at(generated)
+    self.assertEqual(bytes(walls), bytes(m1._grid.walls))
+    self.assertEqual((route, solving), ([], False))
+    walls, route, solving = trace.state_at(generated + 10)
+    self.assertTrue(solving)
+    self.assertEqual(route[0], 0)
+
+    with tempfile.TemporaryDirectory() as directory:
+      path = os.path.join(directory, "run.trace")
+      trace.save(path)
+      loaded = Trace.load(path)
+    self.assertEqual(list(loaded.events()), recorded)
+    self.assertEqual(loaded.state_at(777), trace.state_at(777))
+
+    # Keyframes grow with the events rather than with events times cells,
+    # and a seek decodes at most keyframe_every events
+    big = Trace(150, 150, keyframe_every=1024)
+    big_events = []
+    def big_sink(event):
+      big_events.append(event)
+      big(event)
+    m2 = Maze(0, 0, 150, 150, 1, 1, seed=3, events=big_sink)
+    m2.solve()
+    self.assertLess(big.nbytes, 6 * len(big))
+    self.assertGreater(sum(not keyframe[4] for keyframe in big._keyframes), len(big._keyframes) // 2)
+    with patch.object(big, "_decode", wraps=big._decode) as decode:
+      for step in range(0, len(big), len(big) // 17):
+        # Checked against applying every event from the start
+        expected = tracefile._State(150, 150)
+        for event in big_events[:step]:
+          expected.apply(event)
+        self.assertEqual(big.state_at(step), (expected.walls, expected.route, expected.solving))
+        self.assertLessEqual(decode.call_args.args[2], 1024)
+    with tempfile.TemporaryDirectory() as directory:
+      path = os.path.join(directory, "big.trace")
+      big.save(path)
+      size = os.path.getsize(path)
+      self.assertLess(size, 6 * len(big))
+      reloaded = Trace.load(path)
+      self.assertEqual(reloaded.state_at(len(big) // 2), big.state_at(len(big) // 2))
+      # A loaded trace carries on recording where it left off
+      reloaded(events.PhaseStarted("solve"))
+      self.assertEqual(reloaded.state_at(len(reloaded)), big.state_at(len(big))[:1] + ([], True))
+      with open(path, "r+b") as f:
+        f.truncate(size - 10)
+      with self.assertRaises(TraceError):
+        Trace.load(path)
+
+    # Playing draws the events without running the maze again
+    win = self.make_offscreen_window()
+    player = TracePlayer(loaded, events.EventRenderer(win, 0, 0, 20, 25, 10, 10))
+    player.seek(generated)
+    self.assertEqual(bytes(player.renderer._grid.walls), bytes(m1._grid.walls))
+    self.assertEqual(player.advance(50), 50)
+    pending = []
+    win._Window__root.after.side_effect = lambda delay, callback: pending.append(callback)
+    player.play(events_per_frame=1000)
+    while pending:
+      pending.pop()()
+    self.assertEqual(player.position, len(recorded))
+
+  def test_viewport_draws_only_visible_tiles(self):
+    m1 = Maze(0, 0, 300, 400, 1, 1, seed=2, generator="sidewinder")
+    win = self.make_offscreen_window()
+    win.make_image = MagicMock(side_effect=lambda data: data)
+    canvas = win._Window__canvas
+
+    # The whole maze fits at two pixels per cell
+    view = m1.viewport(win, 800, 600)
+    self.assertEqual(view.scale, 2)
+    self.assertEqual(view.tiles_rendered, len(view.visible_tiles()))
+    self.assertEqual(canvas.create_image.call_count, view.tiles_rendered)
+
+    # Zoomed in, only the tiles around the centre are drawn
+    view.zoom(8)
+    self.assertEqual(view.scale, 16)
+    tiles = view.visible_tiles()
+    self.assertLessEqual(len(tiles), 20)
+    self.assertIn((150 // 16, 200 // 16), tiles)
+    rendered = view.tiles_rendered
+
+    # Panning and zooming back reuse cached tiles
+    view.pan(10, 0)
+    view.pan(-10, 0)
+    view.zoom(1 / 8)
+    view.zoom(8)
+    self.assertEqual(view.tiles_rendered, rendered)
+
+
+    # Changing a wall drops the cache
+    m1._grid.remove_wall(10, 10, RIGHT)
+    view.draw()
+    self.assertEqual(view.tiles_rendered, rendered + len(tiles))
+
+    # Zoomed right out, each tile stands for many cells
+    view.zoom(1 / 1024)
+    self.assertEqual(view.scale, 1 / 64)
+    self.assertEqual(view.visible_tiles(), [(0, 0)])
+
+    # A tile is the matching crop of the full image
+    cell_px = 8
+    full = list(_pixel_rows(m1._grid, cell_px, 1))
+    tile = tile_ppm(m1._grid, range(32, 64), range(0, 32), cell_px)
+    header, pixels = tile.split(b"\n255\n", 1)
+    self.assertEqual(header, b"P5\n257 257")
+    width = 32 * cell_px + 1
+    expected = b"".join(row[:width] for row in full[32 * cell_px:64 * cell_px + 1])
+    self.assertEqual(pixels, expected)
+
+    # The cache is bounded
+    small = m1.viewport(win, 800, 600, scale=64, cache_tiles=4)
+    for _ in range(10):
+      small.pan(300, 0)
+    self.assertLessEqual(len(small._cache), 4)
+
+  def test_server_endpoints(self):
+    async def fetch(port, target, headers=""):
+      reader, writer = await asyncio.open_connection("127.0.0.1", port)
+      writer.write(f"GET {target} HTTP/1.1\r\nHost: localhost\r\n{headers}\r\n".encode())
+      await writer.drain()
+      response = await reader.read()
+      writer.close()
+      head, _, body = response.partition(b"\r\n\r\n")
+      return head.decode(), body
+
+    def unchunk(body):
+      data = b""
+      while True:
+        size, _, body = body.partition(b"\r\n")
+        if int(size, 16) == 0:
+          return data
+        data += body[:int(size, 16)]
+        body = body[int(size, 16) + 2:]
+
+    def frames(body):
+      # Server frames are unmasked, with 7, 16 or 64 bit lengths
+      messages = []
+      while body:
+        opcode = body[0] & 0x0F
+        length = body[1]
+        offset = 2
+        if length == 126:
+          length, = struct.unpack("!H", body[2:4])
+          offset = 4
+        elif length == 127:
+          length, = struct.unpack("!Q", body[2:10])
+          offset = 10
+        messages.append((opcode, body[offset:offset + length]))
+        body = body[offset + length:]
+      return messages
+
+    async def run():
+      service = server.MazeServer(workers=1, cache_size=2)
+      _, port = await service.start(port=0)
+      try:
+        head, body = await fetch(port, "/maze?rows=20&cols=30&seed=5&generator=prim")
+        self.assertIn("200 OK", head)
+        with tempfile.TemporaryDirectory() as directory:
+          path = os.path.join(directory, "served.maze")
+          with open(path, "wb") as f:
+            f.write(body)
+          m1 = Maze.load(path)
+        m2 = Maze(0, 0, 20, 30, 1, 1, seed=5, generator="prim")
+        self.assertEqual(bytes(m1._grid.walls[:]), bytes(m2._grid.walls))
+
+        # Solutions stream in chunks; a repeat request is served from the cache
+        server.CHUNK_CELLS = 7
+        for _ in range(2):
+          head, body = await fetch(port, "/solve?rows=20&cols=30&seed=5&generator=prim&algo=bfs")
+          self.assertIn("Transfer-Encoding: chunked", head)
+          result = json.loads(unchunk(body))
+          self.assertEqual([tuple(cell) for cell in result["path"]], m2.solve("bfs").path)
+        self.assertEqual(service.cache.hits, 1)
+
+        head, body = await fetch(port, "/events?rows=6&cols=7&seed=1",
+                                 "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                                 "Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\n")
+        self.assertIn("101 Switching Protocols", head)
+        self.assertIn("s3pPLMBiTxaQ9kYGzzhZRbK+xOo=", head)
+        messages = frames(body)
+        self.assertEqual(messages[-1], (0x8, b""))
+        self.assertEqual(json.loads(messages[-2][1]), {"done": True})
+        received = [event for _, data in messages[:-2] for event in json.loads(data)]
+        self.assertEqual(received[0], ["phase", "generate"])
+        self.assertEqual(received[-1][0], "path")
+        self.assertEqual(len(service.cache), 2)
+        # Cached results are counted by their size once they are done
+        self.assertGreater(service.cache.bytes, 0)
+
+        head, _ = await fetch(port, "/solve?rows=0&cols=5")
+        self.assertIn("400", head)
+        head, _ = await fetch(port, "/solve?algo=nope")
+        self.assertIn("400", head)
+        head, _ = await fetch(port, "/nowhere")
+        self.assertIn("404", head)
+      finally:
+        server.CHUNK_CELLS = 10_000
+        await service.close()
+
+    asyncio.run(run())
+
+    # The cache drops old entries to stay within its byte budget
+    cache = server.LRUCache(10, max_bytes=100)
+    cache.put("a", 1, 60)
+    cache.put("b", 2, 30)
+    cache.resize("b", 60)
+    self.assertEqual((cache.get("a"), cache.get("b"), cache.bytes), (None, 2, 60))
+    cache.put("c", 3, 500)
+    self.assertEqual((cache.get("c"), len(cache)), (None, 1))
+
+  def test_tiled_generation(self):
+    m1 = Maze(0, 0, 23, 30, 10, 10, seed=3, generator="eller")
+    grids = []
+    for workers in [1, 2]:
+      grid = Grid(23, 30)
+      grid.set_wall(0, 0, TOP, False)
+      generators.tiled(grid, random.Random(8), tile_size=7, generator="prim", workers=workers)
+      grids.append(grid)
+    # The same seed gives the same maze however many processes built it
+    self.assertEqual(grids[0].walls, grids[1].walls)
+    self.assertFalse(grids[0].has_wall(0, 0, TOP))
+
+    # Tiles joined by a spanning tree still make a perfect maze
+    m1._grid = grids[0]
+    m1._cells = CellGrid(grids[0])
+    self.assert_perfect(m1)
+
+  def test_solve_parallel_over_shared_memory(self):
+    m1 = Maze(0, 0, 30, 40, 10, 10, seed=12, generator="wilson")
+    rng = random.Random(1)
+    cells = [(i, j) for i in range(30) for j in range(40)]
+    pairs = [(rng.choice(cells), rng.choice(cells)) for _ in range(40)]
+    results = m1.solve_parallel(pairs, workers=2)
+    self.assertEqual([r.path for r in results], [bfs(m1._grid, s, g).path for s, g in pairs])
+    dfs_results = m1.solve_parallel(pairs[:4], algorithm="dfs", workers=2)
+    for (start, goal), result in zip(pairs, dfs_results):
+      self.assert_valid_path(m1, result.path, start, goal)
+
+    # Workers write to the same bytes the owner sees
+    with SharedGrid(m1._grid) as shared:
+      memories, grid = attach(shared.name, 30, 40)
+      self.assertEqual(bytes(grid.walls), bytes(m1._grid.walls))
+      grid.remove_wall(0, 0, RIGHT)
+      self.assertFalse(shared._memory.buf[0] & RIGHT)
+      del grid
+      for memory in memories:
+        memory.close()
+
+    with self.assertRaises(ValueError):
+      m1.solve_parallel([((0, 0), (30, 0))])
+
+  def test_braided_weighted_mazes(self):
+    rows, cols = 20, 25
+    perfect = Maze(0, 0, rows, cols, 10, 10, seed=4)
+    braided = Maze(0, 0, rows, cols, 10, 10, seed=4, braid=1.0)
+    self.assertEqual(perfect._grid.count_passages(), rows * cols - 1)
+    self.assertGreater(braided._grid.count_passages(), rows * cols - 1)
+    # Every dead end is opened up when braid is 1
+    for i in range(rows):
+      for j in range(cols):
+        self.assertLess(bin(braided._grid.walls[i * cols + j]).count("1"), 3)
+
+    rng = random.Random(2)
+    weights = [rng.choice((1, 1, 5, 20)) for _ in range(rows * cols)]
+    m1 = Maze(0, 0, rows, cols, 10, 10, seed=4, braid=0.5, weights=weights)
+    goal = (rows - 1, cols - 1)
+
+    # The cheapest cost to each cell, found by relaxing every passage until nothing changes
+    best = [None] * (rows * cols)
+    best[0] = 0
+    changed = True
+    while changed:
+      changed = False
+      for k in range(rows * cols):
+        if best[k] is None:
+          continue
+        i, j = divmod(k, cols)
+        for wall, ni, nj in ((TOP, i - 1, j), (RIGHT, i, j + 1), (BOTTOM, i + 1, j), (LEFT, i, j - 1)):
+          if not (0 <= ni < rows and 0 <= nj < cols) or m1._grid.has_wall(i, j, wall):
+            continue
+          n = ni * cols + nj
+          if best[n] is None or best[k] + weights[n] < best[n]:
+            best[n] = best[k] + weights[n]
+            changed = True
+
+    for algorithm in ("dijkstra", "astar"):
+      result = m1.solve(algorithm)
+      self.assert_valid_path(m1, result.path, (0, 0), goal)
+      self.assertEqual(result.cost, best[-1])
+      self.assertEqual(result.cost, sum(weights[i * cols + j] for i, j in result.path[1:]))
+    # Other solvers report what their path costs
+    result = m1.solve("bfs")
+    self.assertGreaterEqual(result.cost, best[-1])
+    self.assertEqual(perfect.solve("bfs").cost, len(perfect.solve("bfs").path) - 1)
+
+    # Shared-memory workers see the weights too
+    results = m1.solve_parallel([((0, 0), goal)], algorithm="dijkstra", workers=1)
+    self.assertEqual(results[0].cost, best[-1])
+
+    with self.assertRaises(ValueError):
+      Maze(0, 0, rows, cols, 10, 10, weights=weights[1:])
+    with self.assertRaises(ValueError):
+      Maze(0, 0, rows, cols, 10, 10, weights=[0] * (rows * cols))
+    with self.assertRaises(ValueError):
+      Maze(0, 0, rows, cols, 10, 10, weights=[1.5] * (rows * cols))
+
+    # Weights are saved with the walls, so a reloaded maze costs the same
+    with tempfile.TemporaryDirectory() as directory:
+      path = os.path.join(directory, "weighted.bin")
+      m1.save(path)
+      loaded = Maze.load(path)
+      self.assertEqual(list(loaded._grid.weights), weights)
+      self.assertEqual(loaded.solve("dijkstra").cost, best[-1])
+      perfect.save(path)
+      self.assertIsNone(Maze.load(path)._grid.weights)
+    with self.assertRaises(ValueError):
+      Maze(0, 0, rows, cols, 10, 10, braid=2)
+
+  def test_headless_import_skips_optional_modules(self):
+    # A fresh interpreter, since this one has already imported everything
+    code = ("import sys, maze\n"
+            "m = maze.Maze(0, 0, 8, 8, 1, 1, seed=1, generator='kruskal')\n"
+            "m.solve('bfs')\n"
+            "print(' '.join(sorted(set(sys.modules) & {'tkinter', 'numpy', 'multiprocessing'})))")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)))
+    self.assertEqual(out.stdout.strip(), "")
+
 if __name__ == "__main__":
   unittest.main()
\ No newline at end of file
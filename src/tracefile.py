@@ -0,0 +1,498 @@
+"""
+Recording and replay of maze runs in a compact binary trace.
+
+A Trace is an event sink (see events.py): pass it as `Maze(..., events=trace)`
+and every step of generating and solving is recorded. It can be saved,
+loaded, read back as events from any step, and played on a window without
+running the algorithms again.
+
+Each event is one byte in the common case. The cell an event is about is
+stored relative to the cell of the event before it, and nearly every event
+is about the same cell or a neighbour of it:
+
+    bits 0-2  kind: phase, wall removed, visit, backtrack or path found
+    bits 3-5  move from the previous cell: same, up, right, down, left, or
+              far, in which case a zigzag varint of the index delta follows
+    bits 6-7  the removed wall for wall events
+
+A phase stores its number in the move bits. A found path is a varint length
+followed by one move per cell of the path.
+
+Every `keyframe_every` events a keyframe records the walls and the solving
+route, so seeking to any step decodes at most `keyframe_every` events. Most
+keyframes are incremental: they hold only the cells whose walls changed
+since the keyframe before (none at all while solving) and how the route
+changed (cells popped, then cells pushed). A full snapshot is only taken
+once the incremental keyframes since the last one add up to its size, or
+after the walls were reset, so keyframes stay proportional to the number of
+events however big the maze is. A seek starts from the closest full
+snapshot and applies the incremental keyframes after it, which only costs
+about one snapshot's worth of bytes.
+
+File layout (little-endian):
+    magic           4 bytes  b"MZTR"
+    version         u16
+    num_rows        u32
+    num_cols        u32
+    keyframe_every  u32
+    events          u64      number of events
+    data_len        u64
+    data            data_len bytes of encoded events
+    keyframes       u32      number of keyframes, then for each:
+                        step u64, offset u64, cursor i64, solving u8,
+                        full u8, pops u32, pushed u32, changed u32,
+                        pushed route cells as u32 indices, then either
+                        (full) walls packed two cells per byte as in
+                        mazefile.py, or (incremental) `changed` u32 cell
+                        indices followed by their `changed` wall bytes
+"""
+
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+
+from events import PhaseStarted, WallRemoved, Visit, Backtrack, PathFound
+from grid import TOP, RIGHT, BOTTOM, LEFT, ALL_WALLS, DELTAS, OPPOSITE, pack_walls, unpack_walls
+
+MAGIC = b"MZTR"
+VERSION = 3
+
+_HEADER = struct.Struct("<4sHIIIQQ")
+_KEYFRAME = struct.Struct("<QQqBBIII")
+_COUNT = struct.Struct("<I")
+
+# Event kinds
+_PHASE, _WALL, _VISIT, _BACKTRACK, _PATH = range(5)
+# Moves from the previous cell
+_SAME, _UP, _RIGHT, _DOWN, _LEFT, _FAR = range(6)
+
+_PHASES = ("generate", "solve")
+_WALLS = (TOP, RIGHT, BOTTOM, LEFT)
+_WALL_CODES = {wall: code for code, wall in enumerate(_WALLS)}
+
+
+class TraceError(ValueError):
+    pass
+
+
+def _write_varint(data, value):
+    while value > 0x7F:
+        data.append(value & 0x7F | 0x80)
+        value >>= 7
+    data.append(value)
+
+
+def _u32_bytes(values):
+    # Little-endian u32s, as stored in keyframes
+    values = array("I", values)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tobytes()
+
+
+def _u32_array(data):
+    values = array("I", data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def _write_move(data, cursor, cell, cols, low_bits=0):
+    # One byte for the move from `cursor` to `cell`, plus the far delta if needed
+    delta = cell - cursor
+    if delta == 0:
+        move = _SAME
+    elif delta == -cols:
+        move = _UP
+    elif delta == 1 and cell % cols:
+        move = _RIGHT
+    elif delta == cols:
+        move = _DOWN
+    elif delta == -1 and cursor % cols:
+        move = _LEFT
+    else:
+        move = _FAR
+    data.append(low_bits | move << 3)
+    if move == _FAR:
+        _write_varint(data, delta << 1 if delta >= 0 else (-delta << 1) - 1)
+
+
+def _read_move(data, byte, position, cursor, deltas):
+    # The cell a move byte leads to, and the position after any far delta
+    code = byte >> 3 & 7
+    if code == _FAR:
+        value, position = _read_varint(data, position)
+        return cursor + (value >> 1 if not value & 1 else -((value + 1) >> 1)), position
+    return cursor + deltas[code], position
+
+
+def _read_varint(data, position):
+    value = 0
+    shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+class Trace:
+    """
+    An in-memory trace of one maze's events, which records new events when
+    called with them.
+    """
+    def __init__(self, num_rows, num_cols, keyframe_every=4096):
+        if keyframe_every < 1:
+            raise ValueError("keyframe_every must be at least 1")
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self.keyframe_every = keyframe_every
+        self._data = bytearray()
+        self._count = 0
+        # (step, offset, cursor, solving, full, pops, pushed route, changed
+        # cells, walls), by step; see the module docstring
+        self._keyframes = []
+        self._keyframe_steps = []
+        # The index of the full keyframe each keyframe builds on
+        self._keyframe_bases = []
+        self._packed_size = (num_rows * num_cols + 1) // 2
+        # Bytes of incremental keyframes since the last full one
+        self._since_full = 0
+        # The state after the last recorded event, tracking the cells it
+        # changes, and the shortest the route got, since the last keyframe
+        self._state = _State(num_rows, num_cols)
+        self._state.changed = set()
+        self._route_floor = 0
+        self._keyframe_route_len = 0
+        self._cursor = 0
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def nbytes(self):
+        """Bytes taken by the encoded events and the keyframes."""
+        return len(self._data) + sum(len(pushed) + len(walls) for *_, pushed, _, walls in self._keyframes)
+
+    def __call__(self, event):
+        """Record one event; a Trace is itself an event sink."""
+        if self._count % self.keyframe_every == 0:
+            self._add_keyframe()
+        self._cursor = self._encode(event)
+        state = self._state
+        state.apply(event)
+        if len(state.route) < self._route_floor:
+            self._route_floor = len(state.route)
+        self._count += 1
+
+    def _add_keyframe(self):
+        state = self._state
+        route = state.route
+        # A full snapshot once the incremental keyframes since the last one
+        # are as big as it would be, so seeks never apply more than that
+        full = (not self._keyframes or state.walls_reset
+                or self._since_full >= self._packed_size + 4 * len(route))
+        if full:
+            pops = 0
+            pushed = _u32_bytes(route)
+            cells = ()
+            walls = pack_walls(state.walls)
+            self._since_full = 0
+            self._keyframe_bases.append(len(self._keyframes))
+        else:
+            pops = self._keyframe_route_len - self._route_floor
+            pushed = _u32_bytes(route[self._route_floor:])
+            cells = sorted(state.changed)
+            walls = _u32_bytes(cells) + bytes(state.walls[k] for k in cells)
+            self._since_full += len(pushed) + len(walls)
+            self._keyframe_bases.append(self._keyframe_bases[-1])
+        self._keyframes.append((self._count, len(self._data), self._cursor, state.solving, full,
+                                pops, pushed, len(cells), walls))
+        self._keyframe_steps.append(self._count)
+        state.changed = set()
+        state.walls_reset = False
+        self._route_floor = self._keyframe_route_len = len(route)
+
+    def _encode_move(self, cell, kind=0, extra=0):
+        # The cell relative to the cursor, in the byte holding kind and extra
+        _write_move(self._data, self._cursor, cell, self.num_cols, kind | extra << 6)
+        self._cursor = cell
+        return cell
+
+    def _encode(self, event):
+        cols = self.num_cols
+        if isinstance(event, WallRemoved):
+            return self._encode_move(event.i * cols + event.j, _WALL, _WALL_CODES[event.wall])
+        if isinstance(event, Visit):
+            return self._encode_move(event.i * cols + event.j, _VISIT)
+        if isinstance(event, Backtrack):
+            return self._encode_move(event.i * cols + event.j, _BACKTRACK)
+        if isinstance(event, PhaseStarted):
+            self._data.append(_PHASE | _PHASES.index(event.name) << 3)
+            return self._cursor
+        if isinstance(event, PathFound):
+            self._data.append(_PATH)
+            _write_varint(self._data, len(event.path))
+            for i, j in event.path:
+                self._encode_move(i * cols + j)
+            return self._cursor
+        raise TypeError(f"Not a maze event: {event!r}")
+
+    def events(self, start=0, stop=None):
+        """Yield the recorded events from step `start` up to `stop`."""
+        stop = self._count if stop is None else min(stop, self._count)
+        if start >= stop:
+            return
+        keyframe = self._keyframes[bisect_right(self._keyframe_steps, start) - 1]
+        step, position, cursor = keyframe[:3]
+        for event in self._decode(position, cursor, stop - step):
+            if step >= start:
+                yield event
+            step += 1
+
+    def state_at(self, step):
+        """
+        The maze as it stood after the first `step` events, as
+        (walls, route, solving): the wall bytes of every cell, the cells of
+        the solving route so far and whether solving has started.
+        """
+        step = max(0, min(step, self._count))
+        if step == self._count:
+            state = self._state
+            return bytearray(state.walls), list(state.route), state.solving
+        state, _ = self._replay(step)
+        return state.walls, state.route, state.solving
+
+    def _replay(self, step):
+        # Rebuild the state and cursor after `step` events: the closest full
+        # snapshot, the incremental keyframes after it, then the events left
+        index = bisect_right(self._keyframe_steps, step) - 1
+        state = _State(self.num_rows, self.num_cols)
+        for keyframe in self._keyframes[self._keyframe_bases[index]:index + 1]:
+            keyframe_step, position, cursor, solving, full, pops, pushed, changed, walls = keyframe
+            if full:
+                state.walls = unpack_walls(walls, self.num_rows * self.num_cols)
+            else:
+                cell_walls = state.walls
+                for k, value in zip(_u32_array(walls[:4 * changed]), walls[4 * changed:]):
+                    cell_walls[k] = value
+                if pops:
+                    del state.route[-pops:]
+            state.route.extend(_u32_array(pushed))
+            state.solving = solving
+        for event in self._decode(position, cursor, step - keyframe_step):
+            state.apply(event)
+            cursor = self._event_cell(event, cursor)
+        return state, cursor
+
+    def _decode(self, position, cursor, count):
+        data = self._data
+        cols = self.num_cols
+        # Cell index change for each move code
+        deltas = (0, -cols, 1, cols, -1)
+
+        for _ in range(count):
+            byte = data[position]
+            position += 1
+            kind = byte & 7
+            if kind == _PHASE:
+                yield PhaseStarted(_PHASES[byte >> 3 & 7])
+            elif kind == _PATH:
+                length, position = _read_varint(data, position)
+                path = []
+                for _ in range(length):
+                    byte = data[position]
+                    cursor, position = _read_move(data, byte, position + 1, cursor, deltas)
+                    path.append(divmod(cursor, cols))
+                yield PathFound(path)
+            else:
+                cursor, position = _read_move(data, byte, position, cursor, deltas)
+                i, j = divmod(cursor, cols)
+                if kind == _WALL:
+                    yield WallRemoved(i, j, _WALLS[byte >> 6])
+                elif kind == _VISIT:
+                    yield Visit(i, j)
+                else:
+                    yield Backtrack(i, j)
+
+    def save(self, path):
+        """Write the trace, including its keyframes, to `path`."""
+        with open(path, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, self.num_rows, self.num_cols, self.keyframe_every,
+                                 self._count, len(self._data)))
+            f.write(self._data)
+            f.write(_COUNT.pack(len(self._keyframes)))
+            for step, offset, cursor, solving, full, pops, pushed, changed, walls in self._keyframes:
+                f.write(_KEYFRAME.pack(step, offset, cursor, solving, full, pops, len(pushed) // 4,
+                                       changed))
+                f.write(pushed)
+                f.write(walls)
+
+    @classmethod
+    def load(cls, path):
+        """Read a trace written by save()."""
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) < _HEADER.size:
+            raise TraceError(f"{path} is too short to be a trace file")
+        magic, version, num_rows, num_cols, keyframe_every, count, data_len = \
+            _HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise TraceError(f"{path} is not a trace file")
+        if version != VERSION:
+            raise TraceError(f"{path} has unsupported trace version {version}")
+
+        trace = cls(num_rows, num_cols, keyframe_every)
+        position = _HEADER.size
+        trace._data = bytearray(data[position:position + data_len])
+        trace._count = count
+        position += data_len
+
+        packed_size = trace._packed_size
+        if position + _COUNT.size > len(data):
+            raise TraceError(f"{path} is truncated")
+        (keyframes,) = _COUNT.unpack_from(data, position)
+        position += _COUNT.size
+        for _ in range(keyframes):
+            if position + _KEYFRAME.size > len(data):
+                raise TraceError(f"{path} is truncated")
+            step, offset, cursor, solving, full, pops, pushed_len, changed = \
+                _KEYFRAME.unpack_from(data, position)
+            position += _KEYFRAME.size
+            pushed = data[position:position + 4 * pushed_len]
+            position += 4 * pushed_len
+            walls_size = packed_size if full else 5 * changed
+            walls = data[position:position + walls_size]
+            position += walls_size
+            if position > len(data) or offset > data_len:
+                raise TraceError(f"{path} is truncated")
+            if full:
+                trace._keyframe_bases.append(len(trace._keyframes))
+            elif trace._keyframes:
+                trace._keyframe_bases.append(trace._keyframe_bases[-1])
+            else:
+                raise TraceError(f"{path} does not start with a full keyframe")
+            trace._keyframes.append((step, offset, cursor, bool(solving), bool(full), pops, pushed,
+                                     changed, walls))
+            trace._keyframe_steps.append(step)
+        if count and not trace._keyframes:
+            raise TraceError(f"{path} is truncated")
+
+        # Carry on from the end, so more events can still be recorded; the
+        # changes since the last keyframe aren't known, so the next is full
+        if count:
+            trace._state, trace._cursor = trace._replay(count)
+            trace._state.changed = set()
+            trace._state.walls_reset = True
+        return trace
+
+    def _event_cell(self, event, cursor):
+        # The cell the cursor is left on after an event
+        if isinstance(event, (WallRemoved, Visit, Backtrack)):
+            return event.i * self.num_cols + event.j
+        if isinstance(event, PathFound) and event.path:
+            i, j = event.path[-1]
+            return i * self.num_cols + j
+        return cursor
+
+
+class _State:
+    # The walls and solving route built up by applying events in order
+    def __init__(self, num_rows, num_cols):
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self.walls = bytearray([ALL_WALLS]) * (num_rows * num_cols)
+        self.route = []
+        self.solving = False
+        # When a set, the cells whose walls change are added to it
+        self.changed = None
+        # Set when the walls are reset by a new generate phase
+        self.walls_reset = False
+
+    def apply(self, event):
+        cols = self.num_cols
+        if isinstance(event, WallRemoved):
+            i, j, wall = event
+            k = i * cols + j
+            self.walls[k] &= ~wall & ALL_WALLS
+            if self.changed is not None:
+                self.changed.add(k)
+            di, dj = DELTAS[wall]
+            if 0 <= i + di < self.num_rows and 0 <= j + dj < cols:
+                k = (i + di) * cols + j + dj
+                self.walls[k] &= ~OPPOSITE[wall] & ALL_WALLS
+                if self.changed is not None:
+                    self.changed.add(k)
+        elif isinstance(event, Visit):
+            if self.solving:
+                self.route.append(event.i * cols + event.j)
+        elif isinstance(event, Backtrack):
+            if self.solving and self.route:
+                self.route.pop()
+        elif isinstance(event, PathFound):
+            self.solving = False
+        elif isinstance(event, PhaseStarted):
+            if event.name == "generate":
+                self.walls = bytearray([ALL_WALLS]) * (self.num_rows * cols)
+                self.walls_reset = True
+                self.solving = False
+            else:
+                self.solving = True
+            self.route = []
+
+
+class TracePlayer:
+    """
+    Plays a Trace on an events.EventRenderer at any speed, with seeking,
+    without running the maze algorithms again.
+    """
+    def __init__(self, trace, renderer):
+        self.trace = trace
+        self.renderer = renderer
+        self.position = 0
+        self.events_per_frame = 1
+        self._playing = False
+
+    def seek(self, step):
+        """Show the maze as it stood after `step` events."""
+        self.position = max(0, min(step, len(self.trace)))
+        walls, route, solving = self.trace.state_at(self.position)
+        self.renderer.show(walls, route, solving)
+
+    def advance(self, count):
+        """Draw the next `count` events; returns how many there were."""
+        applied = 0
+        for event in self.trace.events(self.position, self.position + count):
+            self.renderer.apply(event)
+            applied += 1
+        self.position += applied
+        if applied:
+            self.renderer.redraw()
+        return applied
+
+    def play(self, fps=30, events_per_frame=None):
+        """
+        Play from the current position on the window's timer, drawing
+        `events_per_frame` events (default: keep the current speed) each
+        frame. Change `events_per_frame` while playing to fast-forward.
+        """
+        if events_per_frame is not None:
+            self.events_per_frame = events_per_frame
+        self._playing = True
+        delay = max(1, int(1000 / fps))
+
+        def frame():
+            if not self._playing:
+                return
+            if not self.advance(self.events_per_frame):
+                self._playing = False
+                return
+            self.renderer.after(delay, frame)
+
+        frame()
+
+    def stop(self):
+        self._playing = False
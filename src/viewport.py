@@ -0,0 +1,154 @@
+"""
+A zoomable, pannable view of a maze of any size.
+
+Instead of one canvas item per wall, the maze is cut into square tiles of
+`tile_px` pixels, rasterised with render.tile_ppm and shown as images. Only
+the tiles overlapping the window are drawn, so the cost of a frame depends
+on the window size rather than on the maze size.
+
+The zoom (`scale`, in pixels per cell) is always a power of two. Below two
+pixels per cell a tile draws every n-th row and column of cells, giving a
+coarse overview instead of rasterising millions of cells. Rendered tiles are
+kept in a least-recently-used cache, so panning back and forth or zooming
+in and out again reuses them.
+"""
+
+import math
+from collections import OrderedDict
+
+from render import tile_ppm
+
+# Zoom limits in pixels per cell
+MIN_SCALE = 1 / 64
+MAX_SCALE = 64
+
+
+def _snap(scale):
+    # The nearest power of two within the zoom limits
+    scale = min(max(scale, MIN_SCALE), MAX_SCALE)
+    return 2.0 ** round(math.log2(scale))
+
+
+class Viewport:
+    def __init__(self, win, grid, width, height, scale=None, tile_px=256, cache_tiles=128):
+        if cache_tiles < 1:
+            raise ValueError("cache_tiles must be at least 1")
+        self._win = win
+        self._grid = grid
+        self.width = width
+        self.height = height
+        self.tile_px = tile_px
+        self._cache = OrderedDict()
+        self._cache_tiles = cache_tiles
+        self._version = grid.version
+        # Number of tiles rasterised so far, cache misses included
+        self.tiles_rendered = 0
+
+        # Start with the whole maze in view, centred
+        if scale is None:
+            fit = min(width / grid.num_cols, height / grid.num_rows)
+            scale = 2.0 ** math.floor(math.log2(fit))
+        self.scale = _snap(scale)
+        self.center_x = grid.num_cols / 2
+        self.center_y = grid.num_rows / 2
+
+    def to_cell(self, x, y):
+        """Cell coordinates (column, row) under the window point (x, y)."""
+        return (self.center_x + (x - self.width / 2) / self.scale,
+                self.center_y + (y - self.height / 2) / self.scale)
+
+    def zoom(self, factor, x=None, y=None):
+        """
+        Zoom by `factor` (snapped to a power of two) keeping the cell under
+        window point (x, y), by default the centre, where it is.
+        """
+        x = self.width / 2 if x is None else x
+        y = self.height / 2 if y is None else y
+        cell_x, cell_y = self.to_cell(x, y)
+        self.scale = _snap(self.scale * factor)
+        self.center_x = cell_x - (x - self.width / 2) / self.scale
+        self.center_y = cell_y - (y - self.height / 2) / self.scale
+        self.draw()
+
+    def pan(self, dx, dy):
+        """Move the maze by (dx, dy) window pixels."""
+        self.center_x -= dx / self.scale
+        self.center_y -= dy / self.scale
+        self.draw()
+
+    def _level(self):
+        # (cell_px, step): pixels per drawn cell, and how many cells each
+        # drawn cell stands for along a side
+        if self.scale >= 2:
+            return int(self.scale), 1
+        return 2, round(2 / self.scale)
+
+    def visible_tiles(self):
+        """The (tile_row, tile_col) of every tile overlapping the window."""
+        cell_px, step = self._level()
+        span = self.tile_px // cell_px * step
+        left, top = self.to_cell(0, 0)
+        right, bottom = self.to_cell(self.width, self.height)
+        rows = range(max(0, math.floor(top / span)),
+                     min(math.ceil(self._grid.num_rows / span), math.ceil(bottom / span)))
+        cols = range(max(0, math.floor(left / span)),
+                     min(math.ceil(self._grid.num_cols / span), math.ceil(right / span)))
+        return [(tile_row, tile_col) for tile_row in rows for tile_col in cols]
+
+    def draw(self):
+        """Show the tiles in view, rendering only those not already cached."""
+        # Tiles drawn before the walls changed are out of date
+        if self._grid.version != self._version:
+            self._cache.clear()
+            self._version = self._grid.version
+
+        cell_px, step = self._level()
+        span = self.tile_px // cell_px * step
+        left, top = self.to_cell(0, 0)
+        placements = []
+        for tile_row, tile_col in self.visible_tiles():
+            image = self._tile(cell_px, step, tile_row, tile_col)
+            x = (tile_col * span - left) * self.scale
+            y = (tile_row * span - top) * self.scale
+            placements.append((round(x), round(y), image))
+        self._win.draw_images(placements)
+
+    def _tile(self, cell_px, step, tile_row, tile_col):
+        key = (cell_px, step, tile_row, tile_col)
+        image = self._cache.get(key)
+        if image is not None:
+            self._cache.move_to_end(key)
+            return image
+
+        span = self.tile_px // cell_px * step
+        rows = range(tile_row * span, min((tile_row + 1) * span, self._grid.num_rows), step)
+        cols = range(tile_col * span, min((tile_col + 1) * span, self._grid.num_cols), step)
+        image = self._win.make_image(tile_ppm(self._grid, rows, cols, cell_px))
+        self.tiles_rendered += 1
+
+        self._cache[key] = image
+        if len(self._cache) > self._cache_tiles:
+            self._cache.popitem(last=False)
+        return image
+
+    def bind(self):
+        """Zoom with the mouse wheel and pan by dragging with the left button."""
+        drag = {}
+
+        def on_press(event):
+            drag["x"], drag["y"] = event.x, event.y
+
+        def on_drag(event):
+            self.pan(event.x - drag["x"], event.y - drag["y"])
+            drag["x"], drag["y"] = event.x, event.y
+
+        def on_wheel(event):
+            # Button-4/5 on X11, a signed delta elsewhere
+            up = event.num == 4 or getattr(event, "delta", 0) > 0
+            self.zoom(2 if up else 0.5, event.x, event.y)
+
+        self._win.bind("<ButtonPress-1>", on_press)
+        self._win.bind("<B1-Motion>", on_drag)
+        self._win.bind("<MouseWheel>", on_wheel)
+        self._win.bind("<Button-4>", on_wheel)
+        self._win.bind("<Button-5>", on_wheel)